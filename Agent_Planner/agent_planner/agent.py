@@ -12,6 +12,9 @@ from utils.nodes import (
     model_schedule,
     model_add,
     model_delete,
+    route_schedule,
+    join_context,
+    compact_history,
 )
 
 from utils.state import AgentState
@@ -19,8 +22,10 @@ from langchain_core.messages import HumanMessage, ToolMessage, AIMessage
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolNode
 from utils import tools
-from langgraph.checkpoint.memory import MemorySaver
+from utils.tools import plan_sessions
+from utils.checkpoint import create_checkpointer
 from utils.memory_node import retrieve_semantic_memory, store_interaction_memory
+import threading
 
 # Initialize
 agent = StateGraph(AgentState)
@@ -29,28 +34,50 @@ tool_node = ToolNode(tools)
 # ============ ADD ALL NODES ============
 agent.add_node("retrieve_memory", retrieve_semantic_memory)
 agent.add_node("store_memory", store_interaction_memory)
+agent.add_node("compact_history", compact_history)
 agent.add_node("current_time", get_current_time)
 agent.add_node("get_event", get_events_node)
 agent.add_node("classify_model", classify_model)
+agent.add_node("join_context", join_context)
 agent.add_node("model", model)
 agent.add_node("refine_model", model)
 agent.add_node("scheduler", model_schedule)
 agent.add_node("model_add", model_add)
 agent.add_node("model_delete", model_delete)
 agent.add_node("tool", tool_node)
+agent.add_node("plan_tool", ToolNode([plan_sessions]))
 agent.add_node("human_feedback_reminder", human_feedback)
 agent.add_node("human_feedback_planner", human_feedback)
 agent.add_node("human_feedback_delete", human_feedback)
 
 # ============ DEFINE FLOW ============
-agent.set_entry_point("retrieve_memory")
-agent.add_edge("retrieve_memory", "current_time")
-agent.add_edge("current_time", "get_event")
-agent.add_edge("get_event", "classify_model")
+# Memory retrieval (Weaviate) and classification (LLM) are independent, so
+# they run as parallel branches and join before routing; the turn waits for
+# the slowest one, not the sum. Branches return partial updates merged by
+# the reducers in AgentState.
+CONTEXT_BRANCHES = ["retrieve_memory", "classify_model"]
+
+agent.set_entry_point("compact_history")
+agent.add_edge("compact_history", "current_time")
+for branch in CONTEXT_BRANCHES:
+    agent.add_edge("current_time", branch)
+agent.add_edge(CONTEXT_BRANCHES, "join_context")
+
+# Events are only fetched on the routes that use them; reminders skip it
+agent.add_conditional_edges(
+    "join_context",
+    route_classifier,
+    {
+        "planner": "get_event",
+        "reminder": "model",
+        "delete": "get_event",
+        "get_event": "get_event"
+    }
+)
 
 # FIXED: Route get_event to model (which will call tool), not directly to refine_model
 agent.add_conditional_edges(
-    "classify_model",
+    "get_event",
     route_classifier,
     {
         "planner": "scheduler",
@@ -74,12 +101,14 @@ agent.add_edge("human_feedback_reminder", "model")
 # ============ PLANNER FLOW ============
 agent.add_conditional_edges(
     "scheduler",
-    should_continue,
+    route_schedule,
     {
+        "plan": "plan_tool",
         "tool": "model_add",
         "human_feedback": "human_feedback_planner"
     },
 )
+agent.add_edge("plan_tool", "scheduler")
 agent.add_edge("human_feedback_planner", "scheduler")
 agent.add_edge("model_add", "tool")
 
@@ -100,21 +129,43 @@ agent.add_edge("refine_model", "store_memory")
 agent.add_edge("store_memory", END)
 
 # ============ COMPILE ============
-checkpointer = MemorySaver()
-app = agent.compile(
-    checkpointer=checkpointer,
-    interrupt_before=[
-        "human_feedback_reminder",
-        "human_feedback_planner",
-        "human_feedback_delete"
-    ]
-)
+# Compiled on first use, so importing this module doesn't open the checkpoint
+# database or start its cleanup thread
+_app = None
+_checkpointer = None
+_app_lock = threading.Lock()
+
+def get_app():
+    """The compiled graph, created on first call (thread-safe)"""
+    global _app, _checkpointer
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                # SQLite (WAL) by default, bounded in-memory saver as fallback; see utils/checkpoint.py
+                _checkpointer = create_checkpointer()
+                _app = agent.compile(
+                    checkpointer=_checkpointer,
+                    interrupt_before=[
+                        "human_feedback_reminder",
+                        "human_feedback_planner",
+                        "human_feedback_delete"
+                    ]
+                )
+    return _app
+
+def close_checkpointer() -> bool:
+    """Close the checkpointer if the graph was ever compiled; True if it was"""
+    if _checkpointer is None:
+        return False
+    _checkpointer.close()
+    return True
 
 # from IPython.display import Image, display
 
 # display(Image(app.get_graph().draw_mermaid_png()))
 # %%
 if "__main__" == __name__:
+    app = get_app()
     thread = {"configurable": {"thread_id": "1"}}
     input_ = input("Enter prompt:")
 
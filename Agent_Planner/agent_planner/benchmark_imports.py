@@ -0,0 +1,78 @@
+# benchmark_imports.py - Cold import time of the agent's modules
+#
+# Each import runs in a fresh interpreter, so nothing is already cached in
+# sys.modules. Run it from this directory, then check out the commit before
+# the lazy-import change and run it again to compare:
+#
+#   python benchmark_imports.py                  # median of 5 runs per module
+#   python benchmark_imports.py --runs 10 agent  # only `agent`
+#   python benchmark_imports.py --importtime     # plus the slowest imports (-X importtime)
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+MODULES = ["utils.google_calendar", "utils.checkpoint", "utils.tools", "agent"]
+
+TIMER = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_seconds(module: str) -> float:
+    """Seconds `import module` takes in a new interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(module=module)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _importtime(code: str):
+    """(cumulative µs, name) for every module `python -X importtime -c code` imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return rows
+
+
+def slowest_imports(module: str, top: int = 10):
+    """Slowest imports caused by `import module`; interpreter startup is left out"""
+    startup = {name.strip() for _, name in _importtime("pass")}
+    rows = [row for row in _importtime(f"import {module}") if row[1].strip() not in startup]
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time per module")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            times = [import_seconds(module) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"✗ {module}: import failed\n{e.stderr.strip()}")
+            continue
+        print(
+            f"✓ {module}: median {statistics.median(times) * 1000:.0f} ms, "
+            f"min {min(times) * 1000:.0f} ms over {args.runs} runs"
+        )
+        if args.importtime:
+            for cumulative, name in slowest_imports(module):
+                print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import gradio as gr
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from agent import app
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
+from agent import get_app, close_checkpointer
+import os
+import re
 import uuid
 import signal
 import sys
@@ -8,6 +10,9 @@ import atexit
 
 # Import for cleanup
 from utils.memory_node import get_memory_store_for_cleanup
+from utils.nodes import llm_cache
+from utils.intent import classifier_stats
+from utils.tools import google_cal
 
 def get_user_session(user_id: str = None):
     """Generate or retrieve user session"""
@@ -15,12 +20,44 @@ def get_user_session(user_id: str = None):
         user_id = str(uuid.uuid4())[:8]
     return {"configurable": {"thread_id": user_id}}, user_id
 
-def chat_with_agent(user_input, history, session_state=None):
-    """Enhanced chat function with memory tracking"""
+def request_user_id(request: gr.Request = None):
+    """
+    Stable user id for the browser session: the ?user= query parameter, or
+    the login name when the app runs with auth. The thread id is derived
+    from it, so after a server restart the conversation (and any pending
+    human-feedback step) is picked up again from the checkpoint database.
+    Anonymous sessions get a random id and are not resumable.
+    """
+    if request is None:
+        return None
+    user_id = request.query_params.get("user") or getattr(request, "username", None)
+    if user_id and re.fullmatch(r"[\w.@-]{1,64}", user_id):
+        return user_id
+    return None
+
+# Nodes whose LLM output is the reply shown to the user
+REPLY_NODES = {"model", "refine_model", "scheduler", "model_delete"}
+
+# Shown when a node finishes, until the first reply token arrives
+NODE_PROGRESS = {
+    "compact_history": "🗜️ Earlier conversation summarized...",
+    "retrieve_memory": "🧠 Preferences recalled...",
+    "classify_model": "🔎 Request understood...",
+    "get_event": "📅 Calendar checked...",
+    "plan_tool": "🗓️ Free slots found...",
+    "model_add": "✍️ Events prepared...",
+    "tool": "📅 Calendar updated...",
+}
+
+def chat_with_agent(user_input, history, session_state=None, request: gr.Request = None):
+    """
+    Enhanced chat function with memory tracking. A generator: the reply is
+    streamed token by token, with progress notes while nodes run.
+    """
     
     # Initialize or retrieve session
     if session_state is None:
-        thread, user_id = get_user_session()
+        thread, user_id = get_user_session(request_user_id(request))
         session_state = {"thread": thread, "user_id": user_id}
     else:
         thread = session_state["thread"]
@@ -28,6 +65,7 @@ def chat_with_agent(user_input, history, session_state=None):
     
     # Add user message to history
     history = history + [(user_input, None)]
+    yield history, history, session_state
     
     # Create initial input with user context
     initial_input = {
@@ -36,44 +74,39 @@ def chat_with_agent(user_input, history, session_state=None):
         "thread_id": user_id
     }
     
-    final_output = ""
-    event_data = None
+    streamed = ""
+    streamed_id = None
     
     try:
-        # Stream agent execution
-        for event in app.stream(initial_input, thread, stream_mode="values"):
-            msg = event["messages"][-1]
-            if isinstance(msg, AIMessage):
-                final_output = msg.content
-                event_data = event
-        
-        # print(event_data["messages"][-1])
-        # Handle different task types
-        if (
-            event_data and
-            isinstance(event_data["messages"][-1], AIMessage)
-            and len(event_data["messages"]) >= 2
-            and not isinstance(event_data["messages"][-2], ToolMessage)
-            and event_data.get("task_type") == "reminder"
-        ):
-            bot_reply = final_output
-            history[-1] = (user_input, bot_reply)
-            return history, history, session_state
-        
-        elif (
-            event_data and
-            isinstance(event_data["messages"][-1], AIMessage)
-            and len(event_data["messages"]) >= 2
-            and not isinstance(event_data["messages"][-2], ToolMessage)
-            and event_data.get("task_type") == "planner"
-        ):
-            bot_reply = final_output
-            history[-1] = (user_input, bot_reply)
-            return history, history, session_state
+        # "messages" yields LLM tokens as they are generated, "updates" one
+        # event per finished node
+        app = get_app()
+        for mode, chunk in app.stream(initial_input, thread, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                token, metadata = chunk
+                if metadata.get("langgraph_node") not in REPLY_NODES or not isinstance(token, AIMessageChunk):
+                    continue
+                if not token.content:
+                    continue
+                # A new message (e.g. refine_model after a tool call) replaces the old one
+                if token.id != streamed_id:
+                    streamed, streamed_id = "", token.id
+                streamed += token.content
+                history[-1] = (user_input, streamed)
+                yield history, history, session_state
+            
+            elif not streamed:
+                for node in chunk:
+                    if node in NODE_PROGRESS:
+                        history[-1] = (user_input, NODE_PROGRESS[node])
+                        yield history, history, session_state
         
-        else:
-            history[-1] = (user_input, final_output)
-            return history, history, session_state
+        # The checkpointed state has the authoritative final reply
+        messages = app.get_state(thread).values.get("messages", [])
+        last = messages[-1] if messages else None
+        final_output = last.content if isinstance(last, AIMessage) and last.content else streamed
+        history[-1] = (user_input, final_output)
+        yield history, history, session_state
     
     except Exception as e:
         error_msg = f"❌ Error: {str(e)}"
@@ -81,7 +114,38 @@ def chat_with_agent(user_input, history, session_state=None):
         import traceback
         traceback.print_exc()
         history[-1] = (user_input, error_msg)
-        return history, history, session_state
+        yield history, history, session_state
+
+
+def restore_session(request: gr.Request = None):
+    """On page load, show the checkpointed conversation of a returning user"""
+    user_id = request_user_id(request)
+    if user_id is None:
+        return [], None
+    thread, user_id = get_user_session(user_id)
+    history = []
+    try:
+        for message in get_app().get_state(thread).values.get("messages", []):
+            if isinstance(message, HumanMessage):
+                history.append((message.content, None))
+            elif isinstance(message, AIMessage) and message.content and history:
+                history[-1] = (history[-1][0], message.content)
+    except Exception as e:
+        print(f"⚠ Could not restore conversation for {user_id}: {e}")
+        return [], None
+    if history:
+        print(f"✓ Resumed conversation for {user_id} ({len(history)} turns)")
+    return history, {"thread": thread, "user_id": user_id}
+
+
+def clear_conversation(session_state=None):
+    """Start over: the thread's checkpoints are dropped, so a reload doesn't bring it back"""
+    if session_state is not None:
+        try:
+            get_app().checkpointer.delete_thread(session_state["thread"]["configurable"]["thread_id"])
+        except Exception as e:
+            print(f"⚠ Could not clear conversation: {e}")
+    return [], None
 
 
 # ============ CLEANUP HANDLERS ============
@@ -96,6 +160,29 @@ def cleanup_resources():
             print("✓ Weaviate connection closed")
     except Exception as e:
         print(f"⚠ Cleanup warning: {e}")
+    try:
+        stats = classifier_stats()
+        if stats["total"]:
+            print(
+                f"✓ Intent rules: {stats['rule_hits']}/{stats['total']} classified without the LLM "
+                f"({stats['hit_rate']:.0%}), {stats['rule_avg_ms']:.2f} ms vs {stats['llm_avg_ms']:.0f} ms avg"
+            )
+    except Exception as e:
+        print(f"⚠ Classifier stats warning: {e}")
+    try:
+        for node, stats in llm_cache.stats().items():
+            print(
+                f"✓ LLM cache [{node}]: {stats['hits']} hits / {stats['misses']} misses, "
+                f"~{stats['seconds_saved']:.1f}s saved"
+            )
+        llm_cache.close()
+    except Exception as e:
+        print(f"⚠ LLM cache cleanup warning: {e}")
+    try:
+        if close_checkpointer():
+            print("✓ Checkpointer closed")
+    except Exception as e:
+        print(f"⚠ Checkpointer cleanup warning: {e}")
 
 def signal_handler(sig, frame):
     """Handle Ctrl+C and other termination signals"""
@@ -111,6 +198,10 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 # ============ GRADIO INTERFACE ============
 
+# Turns processed at once; further requests wait in the queue
+GRADIO_CONCURRENCY = int(os.getenv("GRADIO_CONCURRENCY", "8"))
+GRADIO_MAX_QUEUE = int(os.getenv("GRADIO_MAX_QUEUE", "100"))
+
 with gr.Blocks() as demo:
     gr.Markdown("# 🤖 AI Agent Planner with Memory")
     gr.Markdown("Your intelligent scheduling assistant with semantic memory")
@@ -131,7 +222,10 @@ with gr.Blocks() as demo:
     )
     
     clear = gr.Button("Clear Conversation")
-    clear.click(lambda: ([], None), None, [chatbot, session_state])
+    clear.click(clear_conversation, session_state, [chatbot, session_state])
+    
+    # Open the app as /?user=<id> to resume that user's conversation
+    demo.load(restore_session, None, [chatbot, session_state])
     
     gr.Examples(
         examples=[
@@ -146,7 +240,17 @@ with gr.Blocks() as demo:
 if __name__ == "__main__":
     try:
         print("🚀 Starting AI Agent Planner...")
-        demo.launch()
+        # Connect (and run the OAuth flow if needed) and open the checkpointer
+        # before serving, not inside the first user's request
+        try:
+            google_cal.ensure_connected()
+        except Exception as e:
+            print(f"⚠ Google Calendar not connected yet, will retry on first use: {e}")
+        get_app()
+        demo.queue(
+            default_concurrency_limit=GRADIO_CONCURRENCY,
+            max_size=GRADIO_MAX_QUEUE,
+        ).launch()
     except KeyboardInterrupt:
         print("\n⚠ Keyboard interrupt detected")
     finally:
@@ -0,0 +1,211 @@
+# utils/checkpoint.py - Bounded graph checkpointers (SQLite on disk, or in memory)
+
+from collections import OrderedDict
+import os
+import sqlite3
+import threading
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")  # "sqlite" or "memory"
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.sqlite")
+# Newest checkpoints kept per thread; resuming only needs the latest one
+CHECKPOINTS_PER_THREAD = int(os.getenv("CHECKPOINTS_PER_THREAD", "20"))
+# Threads untouched for this long are dropped entirely
+THREAD_IDLE_TTL = float(os.getenv("THREAD_IDLE_TTL", str(7 * 24 * 3600)))
+# In-memory backend only: most threads held in RAM before LRU eviction
+MAX_THREADS_IN_MEMORY = int(os.getenv("MAX_THREADS_IN_MEMORY", "500"))
+CHECKPOINT_CLEANUP_INTERVAL = float(os.getenv("CHECKPOINT_CLEANUP_INTERVAL", "600"))
+SQLITE_CACHE_KB = 16 * 1024  # page cache bound per connection
+
+
+def _thread_id(config) -> str:
+    return config["configurable"]["thread_id"]
+
+
+class _CleanupThread:
+    """Runs `cleanup` every `interval` seconds on a daemon thread until stopped"""
+
+    def __init__(self, cleanup, interval: float):
+        self._cleanup = cleanup
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="checkpoint-cleanup", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self._cleanup()
+            except Exception as e:
+                print(f"⚠ Checkpoint cleanup error: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver that holds at most `max_threads` threads, evicting the least
+    recently used one, and drops threads idle for longer than `idle_ttl`.
+    State is still lost on restart; use the SQLite backend to keep it.
+    """
+
+    def __init__(self, max_threads: int = MAX_THREADS_IN_MEMORY,
+                 idle_ttl: float = THREAD_IDLE_TTL,
+                 cleanup_interval: float = CHECKPOINT_CLEANUP_INTERVAL):
+        super().__init__()
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self._last_used = OrderedDict()  # thread_id -> time, least recent first
+        self._lru_lock = threading.Lock()
+        self._cleaner = _CleanupThread(self.cleanup, cleanup_interval)
+
+    def put(self, config, *args, **kwargs):
+        result = super().put(config, *args, **kwargs)
+        with self._lru_lock:
+            self._last_used[_thread_id(config)] = time.time()
+            self._last_used.move_to_end(_thread_id(config))
+            evicted = []
+            while len(self._last_used) > self.max_threads:
+                evicted.append(self._last_used.popitem(last=False)[0])
+        for thread_id in evicted:
+            self.delete_thread(thread_id)
+        return result
+
+    def cleanup(self):
+        """Drop threads idle for longer than idle_ttl"""
+        cutoff = time.time() - self.idle_ttl
+        with self._lru_lock:
+            idle = [t for t, used in self._last_used.items() if used < cutoff]
+            for thread_id in idle:
+                del self._last_used[thread_id]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+        if idle:
+            print(f"✓ Evicted {len(idle)} idle threads from memory")
+
+    def close(self):
+        self._cleaner.stop()
+
+
+def _sqlite_saver_class():
+    """Imported lazily: langgraph-checkpoint-sqlite is an optional dependency"""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    class BoundedSqliteSaver(SqliteSaver):
+        """
+        SqliteSaver on a WAL-mode database, so checkpoints survive restarts
+        (interrupted human-feedback flows can be resumed) and RAM use is
+        bounded by SQLite's page cache. A background job keeps the newest
+        `per_thread` checkpoints of each thread and deletes idle threads.
+        """
+
+        def __init__(self, path: str = CHECKPOINT_DB,
+                     per_thread: int = CHECKPOINTS_PER_THREAD,
+                     idle_ttl: float = THREAD_IDLE_TTL,
+                     cleanup_interval: float = CHECKPOINT_CLEANUP_INTERVAL):
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+            super().__init__(conn)
+            self.setup()
+            with self.cursor() as cur:
+                cur.execute(
+                    "CREATE TABLE IF NOT EXISTS thread_activity "
+                    "(thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+                )
+                # Threads saved before this table existed, or whose activity
+                # wasn't flushed before a crash, start their idle clock now
+                cur.execute(
+                    "INSERT OR IGNORE INTO thread_activity (thread_id, last_used) "
+                    "SELECT DISTINCT thread_id, ? FROM checkpoints",
+                    (time.time(),),
+                )
+
+            self.path = path
+            self.per_thread = max(1, per_thread)
+            self.idle_ttl = idle_ttl
+            # Activity is buffered here and written by cleanup, so put()
+            # doesn't pay for an extra write
+            self._activity = {}
+            self._activity_lock = threading.Lock()
+            self._closed = False
+            self._cleaner = _CleanupThread(self.cleanup, cleanup_interval)
+            print(f"✓ Checkpoints stored in {os.path.abspath(path)}")
+
+        def put(self, config, *args, **kwargs):
+            result = super().put(config, *args, **kwargs)
+            with self._activity_lock:
+                self._activity[_thread_id(config)] = time.time()
+            return result
+
+        def _flush_activity(self, cur):
+            with self._activity_lock:
+                activity, self._activity = self._activity, {}
+            cur.executemany(
+                "INSERT INTO thread_activity (thread_id, last_used) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_used = excluded.last_used",
+                activity.items(),
+            )
+
+        def cleanup(self):
+            """Apply per-thread retention and drop idle threads"""
+            with self.cursor() as cur:
+                self._flush_activity(cur)
+
+                cur.execute(
+                    "SELECT thread_id FROM thread_activity WHERE last_used < ?",
+                    (time.time() - self.idle_ttl,),
+                )
+                idle = [(row[0],) for row in cur.fetchall()]
+                for table in ("checkpoints", "writes", "thread_activity"):
+                    cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", idle)
+
+                # Checkpoint ids are time-ordered, so the newest sort last
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE rowid IN ("
+                    " SELECT rowid FROM ("
+                    "  SELECT rowid, ROW_NUMBER() OVER ("
+                    "   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC"
+                    "  ) AS position FROM checkpoints"
+                    " ) WHERE position > ?)",
+                    (self.per_thread,),
+                )
+                pruned = cur.rowcount
+                cur.execute(
+                    "DELETE FROM writes WHERE NOT EXISTS ("
+                    " SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+                    " AND c.checkpoint_ns = writes.checkpoint_ns"
+                    " AND c.checkpoint_id = writes.checkpoint_id)"
+                )
+
+            if idle or pruned > 0:
+                print(f"✓ Checkpoint cleanup: {len(idle)} idle threads, {pruned} old checkpoints removed")
+            with self.lock:
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        def close(self):
+            """Final cleanup and close; safe to call more than once"""
+            if self._closed:
+                return
+            self._cleaner.stop()
+            self.cleanup()
+            with self.lock:
+                self.conn.close()
+            self._closed = True
+
+    return BoundedSqliteSaver
+
+
+def create_checkpointer(backend: str = CHECKPOINT_BACKEND):
+    """Checkpointer for the compiled graph, chosen by CHECKPOINT_BACKEND"""
+    if backend == "sqlite":
+        try:
+            return _sqlite_saver_class()()
+        except ImportError:
+            print("⚠ langgraph-checkpoint-sqlite not installed, keeping checkpoints in memory")
+    return BoundedMemorySaver()
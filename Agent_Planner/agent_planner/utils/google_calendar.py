@@ -1,22 +1,260 @@
 import datetime
 from zoneinfo import ZoneInfo
 import os.path
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from functools import lru_cache
+import json
+import queue
+import threading
+import time
 
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+# API clients kept for concurrent requests; each owns its HTTP transport
+CALENDAR_POOL_SIZE = int(os.getenv("CALENDAR_POOL_SIZE", "8"))
+TIMEZONE = ZoneInfo("Asia/Kolkata")
+CACHE_TTL = 60  # seconds a synced cache is trusted before the next incremental sync
+# A full sync fetches this far ahead. Recurring events are expanded
+# (singleEvents), so a series with no end date would otherwise fill the cache
+# to the end of time; a longer request resyncs with a wider horizon.
+SYNC_HORIZON_MONTHS = int(os.getenv("SYNC_HORIZON_MONTHS", "6"))
+
+# Paging and partial responses for the events().list sync; status shows
+# cancellations and nextSyncToken drives the next incremental sync
+PAGE_SIZE = 250
+SYNC_FIELDS = "items(id,summary,start,end,status,transparency),nextPageToken,nextSyncToken"
+
+# Batch endpoint: the Calendar API accepts at most 50 calls per batch
+BATCH_LIMIT = 50
+BATCH_RETRIES = 3
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _event_time(value: dict) -> datetime:
+    """Parse an event start/end ({"dateTime": ...} or all-day {"date": ...})"""
+    if "dateTime" in value:
+        dt = datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+        return dt if dt.tzinfo else dt.replace(tzinfo=TIMEZONE)
+    return datetime.fromisoformat(value["date"]).replace(tzinfo=TIMEZONE)
+
+
+def merge_intervals(intervals):
+    """Sort (start, end) pairs and merge the ones that overlap or touch"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def invert_intervals(busy, window_start: datetime, window_end: datetime):
+    """Free gaps inside [window_start, window_end) around merged busy intervals"""
+    free = []
+    cursor = window_start
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def format_intervals_by_day(intervals):
+    """
+    Compact text for prompts: one line per day listing that day's slots,
+    e.g. "2025-11-03 (Mon): 09:00-10:30, 14:00-24:00".
+    """
+    days = {}
+    for start, end in intervals:
+        start, end = start.astimezone(TIMEZONE), end.astimezone(TIMEZONE)
+        while start < end:
+            midnight = (start + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            piece_end = min(end, midnight)
+            end_label = "24:00" if piece_end == midnight else piece_end.strftime("%H:%M")
+            days.setdefault(start.date(), []).append(f"{start.strftime('%H:%M')}-{end_label}")
+            start = piece_end
+    return "\n".join(
+        f"{day.isoformat()} ({day.strftime('%a')}): {', '.join(slots)}"
+        for day, slots in days.items()
+    )
+
+
+class EventCache:
+    """
+    Local copy of one calendar's events, kept current with the Calendar API's
+    incremental sync (syncToken). Events are indexed by start time so window
+    queries are a bisect plus a short scan.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.events = {}        # id -> event dict
+        self._index = []        # sorted [(start, id)]
+        self._longest = timedelta(0)
+        self.sync_token = None
+        self.synced_at = None
+        self.horizon = None     # events starting at or after this aren't kept
+
+    def covers(self, time_max: datetime) -> bool:
+        return self.horizon is not None and time_max <= self.horizon
+
+    @property
+    def is_fresh(self):
+        return (
+            self.sync_token is not None
+            and self.synced_at is not None
+            and time.monotonic() - self.synced_at < CACHE_TTL
+        )
+
+    def invalidate(self):
+        """Force an incremental sync on the next read"""
+        self.synced_at = None
+
+    def apply(self, event: dict):
+        """Insert, update or (for cancelled events) remove one event"""
+        self.remove(event.get("id"))
+        if event.get("status") == "cancelled" or "start" not in event:
+            return
+
+        start, end = _event_time(event["start"]), _event_time(event["end"])
+        if self.horizon is not None and start >= self.horizon:
+            return
+        self.events[event["id"]] = {
+            "id": event.get("id"),
+            "summary": event.get("summary", "No Title"),
+            "start": event.get("start"),
+            "end": event.get("end"),
+            "_start": start,
+            "_end": end,
+            # Like freebusy: all-day and "show as free" events don't block time
+            "_busy": "dateTime" in event["start"] and event.get("transparency") != "transparent",
+        }
+        insort(self._index, (start, event["id"]))
+        self._longest = max(self._longest, end - start)
+
+    def remove(self, event_id: str):
+        event = self.events.pop(event_id, None)
+        if event is not None:
+            pos = bisect_left(self._index, (event["_start"], event_id))
+            if pos < len(self._index) and self._index[pos][1] == event_id:
+                self._index.pop(pos)
+
+    def _overlapping(self, time_min: datetime, time_max: datetime):
+        lo = bisect_left(self._index, (time_min - self._longest,))
+        hi = bisect_left(self._index, (time_max,))
+        for _, event_id in self._index[lo:hi]:
+            event = self.events[event_id]
+            if event["_end"] > time_min:
+                yield event
+
+    def window(self, time_min: datetime, time_max: datetime):
+        """Events overlapping [time_min, time_max), ordered by start time"""
+        return [
+            {k: v for k, v in event.items() if not k.startswith("_")}
+            for event in self._overlapping(time_min, time_max)
+        ]
+
+    def busy(self, time_min: datetime, time_max: datetime):
+        """Merged busy intervals in [time_min, time_max)"""
+        return merge_intervals(
+            (max(event["_start"], time_min), min(event["_end"], time_max))
+            for event in self._overlapping(time_min, time_max)
+            if event["_busy"]
+        )
+
+
+@lru_cache(maxsize=None)
+def _discovery_document():
+    """
+    Calendar v3 discovery document, loaded and parsed once per process from
+    the copy bundled with googleapiclient; None if it isn't bundled.
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+
+    document = get_static_doc("calendar", "v3")
+    return json.loads(document) if document else None
+
+
+class ServicePool:
+    """
+    Pool of Calendar API clients. httplib2 transports are not thread-safe,
+    so each client gets its own and is used by one thread at a time;
+    clients are created on demand, up to `size`.
+    """
+
+    def __init__(self, factory, size: int = CALENDAR_POOL_SIZE):
+        self._factory = factory
+        self._size = size
+        self._idle = queue.LifoQueue()  # most recently used first: warm connections
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def add(self, service):
+        """Put an already built client into the pool"""
+        with self._lock:
+            self._created += 1
+        self._idle.put(service)
+
+    @contextmanager
+    def client(self):
+        try:
+            service = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self._size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    service = self._factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                service = self._idle.get()  # wait for a client to come back
+        try:
+            yield service
+        finally:
+            self._idle.put(service)
 
 
 class GoogleCalendar:
-    def __init__(self): ...
+    def __init__(self, service=None, credentials_file: str = None):
+        # A service can be injected directly (e.g. a local fake in tests).
+        # Otherwise OAuth and the client build wait for the first API call.
+        self._pool = None
+        if service is not None:
+            self._pool = ServicePool(lambda: service, size=1)
+        self._credentials_file = credentials_file
+        self._connect_lock = threading.Lock()
+        self._caches = {}  # calendarId -> EventCache
+        # Serializes cache reads/syncs between Gradio worker threads
+        self._cache_lock = threading.RLock()
+        # Bumped on every create/delete so callers holding fetched events
+        # can tell whether they are stale
+        self.write_count = 0
 
     def connect(self, file):
+        # Imported here: the auth and discovery stack is slow to import and
+        # only needed once a calendar call is actually made
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         creds = None
 
         if os.path.exists("token.json"):
@@ -33,12 +271,47 @@ class GoogleCalendar:
                 token.write(creds.to_json())
 
         try:
-            self.__service = build("calendar", "v3", credentials=creds)
+            pool = ServicePool(lambda: self._build_service(creds))
+            pool.add(self._build_service(creds))
+            self._pool = pool
             print("connected successful")
         except HttpError as error:
             print(f"An error occurred: {error}")
 
-    def get_events(self, max_period: str = "10d"):
+    @staticmethod
+    def _build_service(creds):
+        """A Calendar client with its own httplib2 transport"""
+        from googleapiclient.discovery import build, build_from_document
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+
+        http = AuthorizedHttp(creds, http=httplib2.Http())
+        document = _discovery_document()
+        if document is None:
+            return build("calendar", "v3", http=http)
+        return build_from_document(document, http=http)
+
+    def ensure_connected(self):
+        """
+        Connect now if not connected yet. Call it at startup: the OAuth flow
+        may open a browser, which shouldn't happen inside a user's request.
+        """
+        if self._pool is None:
+            with self._connect_lock:
+                if self._pool is None and self._credentials_file is not None:
+                    self.connect(self._credentials_file)
+            if self._pool is None:
+                raise RuntimeError("Google Calendar is not connected")
+
+    def _client(self):
+        """
+        Check a Calendar client out of the pool: `with self._client() as service:`.
+        Connects on first use if a credentials file was given.
+        """
+        self.ensure_connected()
+        return self._pool.client()
+
+    def get_events(self, max_period: str = "10d", calendar_id: str = "primary"):
         """
         Returns calendar events within a given period starting from today.
 
@@ -55,8 +328,17 @@ class GoogleCalendar:
             get_events("30d")           # events for next 30 days
             get_events("6m")            # events for next 6 months
             get_events("2022-12-31")    # events until specific date
+
+        Events are served from a local cache kept current with incremental sync.
         """
-        now = datetime.now(tz=ZoneInfo("Asia/Kolkata"))
+        now, max_ = self._window(max_period)
+        with self._cache_lock:
+            cache = self._sync(calendar_id, until=max_)
+            return cache.window(now, max_)
+
+    def _window(self, max_period: str):
+        """Turn a "{N}d" / "{N}m" / "YYYY-MM-DD" period into (now, end) datetimes"""
+        now = datetime.now(tz=TIMEZONE)
         print(max_period)
         # Determine end date
         if max_period.endswith("d"):  # days
@@ -68,7 +350,7 @@ class GoogleCalendar:
         else:
             try:
                 max_ = datetime.fromisoformat(max_period).replace(
-                    tzinfo=ZoneInfo("Asia/Kolkata")
+                    tzinfo=TIMEZONE
                 )+ timedelta(days=1)
             except ValueError:
                 raise ValueError(
@@ -76,42 +358,211 @@ class GoogleCalendar:
                 )
 
         print(f"Getting events from {now.date()} to {max_.date()} {max_.isoformat()}")
+        return now, max_
+
+    def get_busy_intervals(self, max_period: str = "10d", calendar_id: str = "primary"):
+        """
+        Merged busy (start, end) intervals for the period. Computed locally
+        when the event cache is fresh, otherwise asked of freebusy().query,
+        which returns only intervals instead of full events.
+        """
+        now, max_ = self._window(max_period)
+        with self._cache_lock:
+            cache = self._caches.get(calendar_id)
+            if cache is not None and cache.is_fresh and cache.covers(max_):
+                return now, max_, cache.busy(now, max_)
 
-        events_result = (
-            self.__service.events()
-            .list(
-                calendarId="primary",
-                timeMin=now.isoformat(),
-                timeMax=max_.isoformat(),
-                singleEvents=True,
-                orderBy="startTime",
+        with self._client() as service:
+            result = (
+                service.freebusy()
+                .query(body={
+                    "timeMin": now.isoformat(),
+                    "timeMax": max_.isoformat(),
+                    "timeZone": str(TIMEZONE),
+                    "items": [{"id": calendar_id}],
+                })
+                .execute()
             )
-            .execute()
+        busy = result.get("calendars", {}).get(calendar_id, {}).get("busy", [])
+        return now, max_, merge_intervals(
+            (
+                _event_time({"dateTime": b["start"]}).astimezone(TIMEZONE),
+                _event_time({"dateTime": b["end"]}).astimezone(TIMEZONE),
+            )
+            for b in busy
         )
 
+    def _sync(self, calendar_id: str = "primary", until: datetime = None) -> EventCache:
+        """
+        Bring the calendar's cache up to date and return it. The first call
+        does a full sync of events from today to SYNC_HORIZON_MONTHS ahead
+        (or `until`, if later); later calls only fetch changes since the
+        stored syncToken. A 410 (token expired), or an `until` past the
+        synced horizon, triggers a full resync.
+        Callers hold _cache_lock, so concurrent readers wait for one sync.
+        """
+        cache = self._caches.setdefault(calendar_id, EventCache())
+        if until is not None and cache.horizon is not None and not cache.covers(until):
+            print("Requested period is past the synced horizon, doing a full sync")
+            cache.clear()
+        if cache.is_fresh:
+            return cache
+
+        params = {
+            "calendarId": calendar_id,
+            "singleEvents": True,
+            "maxResults": PAGE_SIZE,
+            "fields": SYNC_FIELDS,
+        }
+        if cache.sync_token:
+            params["syncToken"] = cache.sync_token
+        else:
+            # Full sync: nothing before today is ever queried
+            today = datetime.now(tz=TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+            cache.horizon = today + relativedelta(months=SYNC_HORIZON_MONTHS)
+            if until is not None:
+                cache.horizon = max(cache.horizon, until)
+            params["timeMin"] = today.isoformat()
+            params["timeMax"] = cache.horizon.isoformat()
 
-        events = events_result.get("items", [])
-        all_events = []
+        page_token = None
+        while True:
+            try:
+                with self._client() as service:
+                    result = (
+                        service.events()
+                        .list(pageToken=page_token, **params)
+                        .execute()
+                    )
+            except HttpError as error:
+                if error.resp.status == 410 and cache.sync_token:
+                    print("Sync token expired, doing a full sync")
+                    # Keep any horizon a longer request already asked for
+                    until = max(until, cache.horizon) if until else cache.horizon
+                    cache.clear()
+                    return self._sync(calendar_id, until)
+                raise
 
-        for event in events:
-            event_dict = {
-                "id": event.get("id"),  
-                "summary": event.get("summary", "No Title"),
-                "start": event.get("start"),
-                "end": event.get("end"),
-            }
-            all_events.append(event_dict)
+            for event in result.get("items", []):
+                cache.apply(event)
 
-        return all_events
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                cache.sync_token = result.get("nextSyncToken")
+                cache.synced_at = time.monotonic()
+                return cache
 
     def create_event(self, events):
         print("hello function called")
-        event = (
-            self.__service.events().insert(calendarId="primary", body=events).execute()
-        )
+        with self._client() as service:
+            event = (
+                service.events().insert(calendarId="primary", body=events).execute()
+            )
         print(f"Event created:{event.get('htmlLink')}")
+        self._invalidate("primary", created=event)
         return event
 
+    def _execute_batch(self, request_factories: list) -> list:
+        """
+        Run many API calls through the batch endpoint, BATCH_LIMIT per HTTP
+        request. Each factory takes a client and builds one (unexecuted)
+        request; one pooled client serves the whole batch. Calls that fail
+        with a rate-limit or server error are retried with backoff.
+        Returns one (response, error) pair per factory, in order.
+        """
+        results = [None] * len(request_factories)
+        pending = list(range(len(request_factories)))
+
+        for attempt in range(BATCH_RETRIES + 1):
+            retry = []
+
+            def callback(request_id, response, exception):
+                index = int(request_id)
+                if exception is None:
+                    results[index] = (response, None)
+                elif attempt < BATCH_RETRIES and self._is_retryable(exception):
+                    retry.append(index)
+                else:
+                    results[index] = (None, exception)
+
+            with self._client() as service:
+                for start in range(0, len(pending), BATCH_LIMIT):
+                    batch = service.new_batch_http_request(callback=callback)
+                    for index in pending[start:start + BATCH_LIMIT]:
+                        batch.add(request_factories[index](service), request_id=str(index))
+                    batch.execute()
+
+            if not retry:
+                break
+            print(f"Retrying {len(retry)} batched calls (attempt {attempt + 1})")
+            time.sleep(2 ** attempt)
+            pending = sorted(retry)
+
+        return results
+
+    @staticmethod
+    def _is_retryable(error) -> bool:
+        if not isinstance(error, HttpError):
+            return False
+        status = error.resp.status
+        return status in RETRYABLE_STATUS or (status == 403 and "rateLimitExceeded" in str(error))
+
+    def create_events(self, events: list, calendar_id: str = "primary") -> list:
+        """
+        Creates many events with batched requests.
+        Returns one entry per input event: the created event, or
+        {"error": ..., "summary": ...} if that insert failed.
+        """
+        results = self._execute_batch([
+            (lambda service, body=body: service.events().insert(calendarId=calendar_id, body=body))
+            for body in events
+        ])
+
+        created = []
+        for body, (event, error) in zip(events, results):
+            if error is None:
+                self._invalidate(calendar_id, created=event)
+                created.append(event)
+            else:
+                print(f"❌ Failed to create '{body.get('summary')}': {error}")
+                created.append({"error": str(error), "summary": body.get("summary")})
+        print(f"Created {sum('error' not in c for c in created)}/{len(events)} events")
+        return created
+
+    def delete_events(self, event_ids: list, calendar_id: str = "primary") -> dict:
+        """
+        Deletes many events with batched requests.
+        Returns {event_id: True/False} telling which deletes succeeded.
+        """
+        results = self._execute_batch([
+            (lambda service, event_id=event_id: service.events().delete(calendarId=calendar_id, eventId=event_id))
+            for event_id in event_ids
+        ])
+
+        deleted = {}
+        for event_id, (_, error) in zip(event_ids, results):
+            if error is None:
+                self._invalidate(calendar_id, deleted_id=event_id)
+                deleted[event_id] = True
+            else:
+                print(f"❌ An error occurred while deleting {event_id}: {error}")
+                deleted[event_id] = False
+        print(f"✅ Deleted {sum(deleted.values())}/{len(event_ids)} events")
+        return deleted
+
+    def _invalidate(self, calendar_id: str, created: dict = None, deleted_id: str = None):
+        """Reflect our own writes in the cache right away and resync on next read"""
+        with self._cache_lock:
+            self.write_count += 1
+            cache = self._caches.get(calendar_id)
+            if cache is None:
+                return
+            if created is not None:
+                cache.apply(created)
+            if deleted_id is not None:
+                cache.remove(deleted_id)
+            cache.invalidate()
+
     def delete_event(self, event_id: str):
         """
         Deletes an event from the user's primary Google Calendar.
@@ -123,17 +574,221 @@ class GoogleCalendar:
             delete_event("abc123xyz")
         """
         try:
-            self.__service.events().delete(
-                calendarId="primary", eventId=event_id
-            ).execute()
+            with self._client() as service:
+                service.events().delete(
+                    calendarId="primary", eventId=event_id
+                ).execute()
             print(f"✅ Event deleted successfully (ID: {event_id})")
+            self._invalidate("primary", deleted_id=event_id)
             return True
         except HttpError as error:
             print(f"❌ An error occurred while deleting the event: {error}")
             return False
 
 
+class _FakeRequest:
+    def __init__(self, call):
+        self._call = call
+
+    def execute(self):
+        return self._call()
+
+
+class _FakeBatch:
+    def __init__(self, callback):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id):
+        self._requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self._requests:
+            try:
+                self._callback(request_id, request.execute(), None)
+            except HttpError as error:
+                self._callback(request_id, None, error)
+
+
+class FakeCalendarService:
+    """
+    In-memory stand-in for the Calendar v3 client, for GoogleCalendar(service=...).
+    Covers what GoogleCalendar uses: events().list with paging, syncToken
+    and timeMin/timeMax, insert, delete, and the batch endpoint. Every call
+    is recorded in `calls`; expire_sync_tokens() makes the next incremental
+    sync fail with 410 like the real API.
+    """
+
+    def __init__(self):
+        self.stored = {}    # id -> event, cancelled ones kept as tombstones
+        self.changed = {}   # id -> change sequence number
+        self.sequence = 0
+        self.calls = []
+        self._next_id = 0
+        self._token_floor = 0  # sync tokens below this are expired
+
+    def add(self, summary: str, start: datetime, end: datetime) -> dict:
+        """Create an event directly, as another client would"""
+        self._next_id += 1
+        return self._store({
+            "id": f"evt{self._next_id}",
+            "summary": summary,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+            "status": "confirmed",
+        })
+
+    def cancel(self, event_id: str):
+        """Delete an event directly, as another client would"""
+        self._store({**self.stored[event_id], "status": "cancelled"})
+
+    def expire_sync_tokens(self):
+        self._token_floor = self.sequence + 1
+
+    def _store(self, event: dict) -> dict:
+        self.sequence += 1
+        self.stored[event["id"]] = event
+        self.changed[event["id"]] = self.sequence
+        return event
+
+    @staticmethod
+    def _error(status: int, message: str):
+        import httplib2
+
+        content = json.dumps({"error": {"message": message}}).encode()
+        return HttpError(httplib2.Response({"status": status}), content)
+
+    def events(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(callback)
+
+    def list(self, calendarId, pageToken=None, syncToken=None, timeMin=None, timeMax=None,
+             maxResults=PAGE_SIZE, **kwargs):
+        self.calls.append(("list", {"syncToken": syncToken, "timeMin": timeMin,
+                                    "timeMax": timeMax, "pageToken": pageToken}))
+
+        def run():
+            if syncToken is not None:
+                if int(syncToken) < self._token_floor:
+                    raise self._error(410, "Sync token is no longer valid, a full sync is required.")
+                items = [self.stored[i] for i, seq in self.changed.items() if seq > int(syncToken)]
+            else:
+                lo = datetime.fromisoformat(timeMin) if timeMin else None
+                hi = datetime.fromisoformat(timeMax) if timeMax else None
+                items = [
+                    e for e in self.stored.values()
+                    if e["status"] != "cancelled"
+                    and (lo is None or _event_time(e["end"]) > lo)
+                    and (hi is None or _event_time(e["start"]) < hi)
+                ]
+            offset = int(pageToken or 0)
+            page = {"items": items[offset:offset + maxResults]}
+            if offset + maxResults < len(items):
+                page["nextPageToken"] = str(offset + maxResults)
+            else:
+                page["nextSyncToken"] = str(self.sequence)
+            return page
+        return _FakeRequest(run)
+
+    def insert(self, calendarId, body):
+        self.calls.append(("insert", {"summary": body.get("summary")}))
+
+        def run():
+            self._next_id += 1
+            event_id = f"evt{self._next_id}"
+            return self._store({**body, "id": event_id, "status": "confirmed",
+                                "htmlLink": f"https://calendar.example/{event_id}"})
+        return _FakeRequest(run)
+
+    def delete(self, calendarId, eventId):
+        self.calls.append(("delete", {"eventId": eventId}))
+
+        def run():
+            if eventId not in self.stored or self.stored[eventId]["status"] == "cancelled":
+                raise self._error(404, "Not Found")
+            self.cancel(eventId)
+            return ""
+        return _FakeRequest(run)
+
+
+def _self_check():
+    """Cache behaviour against FakeCalendarService; returns the number of failures"""
+    fake = FakeCalendarService()
+    cal = GoogleCalendar(service=fake)
+    now = datetime.now(tz=TIMEZONE).replace(second=0, microsecond=0)
+    hour = timedelta(hours=1)
+    for n in range(PAGE_SIZE + 10):  # more than one page
+        start = now + timedelta(days=1, minutes=30 * n)
+        fake.add(f"Session {n}", start, start + hour)
+    fake.add("Far future", now + timedelta(days=400), now + timedelta(days=400) + hour)
+
+    def list_calls():
+        return [kw for name, kw in fake.calls if name == "list"]
+
+    checks = []
+
+    events = cal.get_events("30d")
+    first = list_calls()
+    checks.append(("full sync pages through every event", len(events) == PAGE_SIZE + 10 and len(first) == 2))
+    checks.append(("full sync is bounded by the horizon", first[0]["timeMax"] is not None and first[0]["syncToken"] is None))
+    checks.append(("events past the horizon are not cached", len(cal._caches["primary"].events) == PAGE_SIZE + 10))
+
+    calls_before = len(fake.calls)
+    cal.get_events("10d")
+    checks.append(("fresh cache is served without API calls", len(fake.calls) == calls_before))
+
+    external = fake.add("Booked elsewhere", now + 2 * hour, now + 3 * hour)
+    fake.cancel("evt1")
+    cal._caches["primary"].invalidate()
+    ids = {e["id"] for e in cal.get_events("10d")}
+    checks.append(("incremental sync uses the syncToken", list_calls()[-1]["syncToken"] is not None))
+    checks.append(("incremental sync applies inserts and cancellations", external["id"] in ids and "evt1" not in ids))
+
+    writes = cal.write_count
+    created = cal.create_event({
+        "summary": "Written here",
+        "start": {"dateTime": (now + 5 * hour).isoformat()},
+        "end": {"dateTime": (now + 6 * hour).isoformat()},
+    })
+    cache = cal._caches["primary"]
+    checks.append(("create is written through to the cache", created["id"] in cache.events and cal.write_count == writes + 1))
+    checks.append(("a write forces a sync on the next read", not cache.is_fresh))
+    cal.delete_event(created["id"])
+    checks.append(("delete is written through to the cache", created["id"] not in cache.events))
+    batch = cal.create_events([
+        {"summary": f"Batch {n}", "start": {"dateTime": (now + 7 * hour).isoformat()},
+         "end": {"dateTime": (now + 8 * hour).isoformat()}}
+        for n in range(3)
+    ])
+    checks.append(("batched creates land in the cache", all(e["id"] in cache.events for e in batch)))
+
+    fake.expire_sync_tokens()
+    cache.invalidate()
+    seen = len(list_calls())
+    ids = {e["id"] for e in cal.get_events("10d")}
+    recent = list_calls()[seen:]
+    checks.append(("410 on an expired token triggers a full resync",
+                   recent[0]["syncToken"] is not None and recent[1]["syncToken"] is None))
+    checks.append(("cache is complete after the resync",
+                   external["id"] in ids and all(e["id"] in ids for e in batch) and "evt1" not in ids))
+
+    failures = 0
+    for label, passed in checks:
+        failures += not passed
+        print(f"{'ok ' if passed else 'FAIL'} {label}")
+    print(f"{len(checks) - failures}/{len(checks)} cache checks passed")
+    return failures
+
+
 if "__main__" == __name__:
+    import sys
+
+    if "--live" not in sys.argv:
+        # Offline: exercise the event cache against FakeCalendarService
+        sys.exit(1 if _self_check() else 0)
+
     google_cal = GoogleCalendar()
 
     google_cal.connect("credentials.json")
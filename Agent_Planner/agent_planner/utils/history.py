@@ -0,0 +1,112 @@
+# utils/history.py - Token-budgeted message history with a rolling summary
+
+import os
+
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+# Approximate prompt tokens the thread's messages may use before older turns
+# are folded into the summary
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+# After folding, the kept turns use at most this share of the budget, so
+# the summary is not rewritten on every turn
+HISTORY_KEEP_RATIO = 0.5
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("TOOL_OUTPUT_MAX_CHARS", "1500"))
+# Tool outputs a later node acts on in full, so never shortened: model_add
+# turns every session of the plan_sessions result into an event
+UNTRUNCATED_TOOLS = {"plan_sessions"}
+CHARS_PER_TOKEN = 4  # rough average for English text and JSON
+
+SUMMARY_PROMPT = """
+You maintain the running summary of a conversation between a user and a Google Calendar assistant.
+Merge the earlier summary with the new messages below into one updated summary.
+Keep: events created or deleted (title, date, time), pending requests and open questions, durations, deadlines and stated preferences.
+Drop: greetings, repeated tool output and anything already superseded.
+Use at most 200 words. Reply with the summary only.
+
+Earlier summary:
+{summary}
+"""
+
+
+def _text(message) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def estimate_tokens(message) -> int:
+    """Cheap token estimate (no tokenizer): characters / 4 plus per-message overhead"""
+    tokens = len(_text(message)) // CHARS_PER_TOKEN + 4
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += len(str(call.get("args", ""))) // CHARS_PER_TOKEN + 4
+    return tokens
+
+
+def truncate_tool_output(message):
+    """
+    Shorten a large ToolMessage (e.g. a long get_events result) for the
+    prompt. The full output stays in the checkpointed state; outputs of
+    UNTRUNCATED_TOOLS are passed through as they are.
+    """
+    if not isinstance(message, ToolMessage) or message.name in UNTRUNCATED_TOOLS:
+        return message
+    if len(_text(message)) <= TOOL_OUTPUT_MAX_CHARS:
+        return message
+    content = _text(message)
+    omitted = len(content) - TOOL_OUTPUT_MAX_CHARS
+    return message.model_copy(update={
+        "content": f"{content[:TOOL_OUTPUT_MAX_CHARS]}\n"
+                   f"... [{omitted} more characters of {message.name or 'tool'} output omitted]"
+    })
+
+
+def split_history(messages: list, budget: int = HISTORY_TOKEN_BUDGET):
+    """
+    Returns (old, recent). `old` is empty while the history fits the budget.
+    Otherwise the cut is placed at a HumanMessage, so an AI tool call is
+    never separated from its ToolMessages, and the latest turn is always kept.
+    """
+    sizes = [estimate_tokens(truncate_tool_output(m)) for m in messages]
+    if sum(sizes) <= budget:
+        return [], messages
+
+    keep_budget = budget * HISTORY_KEEP_RATIO
+    cut, total = None, 0
+    for i in range(len(messages) - 1, 0, -1):
+        total += sizes[i]
+        if isinstance(messages[i], HumanMessage):
+            if cut is not None and total > keep_budget:
+                break
+            cut = i
+
+    if cut is None:
+        return [], messages
+    return messages[:cut], messages[cut:]
+
+
+def summarize(model, summary: str, old_messages: list) -> str:
+    """Fold `old_messages` into the rolling summary with one LLM call"""
+    transcript = "\n".join(
+        f"{m.type}: {_text(truncate_tool_output(m))}" for m in old_messages
+    )
+    try:
+        response = model.invoke([
+            SystemMessage(content=SUMMARY_PROMPT.format(summary=summary or "(none)")),
+            HumanMessage(content=transcript),
+        ])
+        return response.content.strip()
+    except Exception as e:
+        # Never lose context: keep a plain extract of the user's requests
+        print(f"⚠ History summary failed, using an extract: {e}")
+        requests = "; ".join(_text(m)[:100] for m in old_messages if isinstance(m, HumanMessage))
+        return f"{summary}\nEarlier requests: {requests}".strip()
+
+
+def prompt_history(state) -> list:
+    """
+    Messages to send after a node's system prompt: the rolling summary (if
+    any), then the kept turns with large tool outputs truncated.
+    """
+    messages = [truncate_tool_output(m) for m in state["messages"]]
+    if state.get("summary"):
+        summary = SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}")
+        messages = [summary] + messages
+    return messages
@@ -0,0 +1,145 @@
+# utils/intent.py - Rule-based fast path for classify_model
+
+import re
+import threading
+
+# (task_type, weight, pattern). Weights break ties when several rules fire,
+# e.g. "delete my study plan" matches delete and planner but is a delete.
+RULES = [
+    # Only when the request itself is a removal: a leading verb or "cancel my ...".
+    # Not "clear" or "drop": "clear my evening", "drop off the kids" create events.
+    # "remind me to cancel my gym membership" is handled in classify_intent.
+    ("delete", 3, re.compile(
+        r"^\s*(please\s+)?((can|could|would) you\s+)?(please\s+)?(i want to\s+)?"
+        r"(delete|remove|cancel|erase)\b"
+        r"|\b(delete|remove|cancel|erase)\s+(all\s+)?(my|the|these|those|this|that)\b",
+        re.I,
+    )),
+    ("get_event", 2, re.compile(
+        r"^\s*(what|which|show|list|get|display|view|fetch|see|check|any)\b.*"
+        r"\b(events?|schedule|calendar|meetings?|agenda|appointments?|plans?|busy|free)\b"
+        r"|\b(what do i have|what'?s on|am i (free|busy)|do i have any)\b",
+        re.I,
+    )),
+    ("planner", 2, re.compile(
+        # A planning phrase, not a bare "plan" ("add a plan review meeting")
+        r"\b(plan (my|for|out|the next)|(make|create|build|draw up) (me )?(a|my) (study )?plan|"
+        r"planner|study (schedule|plan)|timetable|roadmap|time[- ]?block(ing)?|"
+        r"prepare for|preparation|revision|syllabus|milestones?|"
+        r"over the next \d+ (days|weeks|months)|for (the next )?\d+ (weeks|months))\b",
+        re.I,
+    )),
+    ("reminder", 1, re.compile(
+        r"\b(remind|reminder|schedule|book|add|set up|create|put)\b|"
+        r"\b(birthday|anniversary|meeting|call|appointment)\b",
+        re.I,
+    )),
+]
+
+# Replies to a question ("yes, go ahead with this plan") depend on the
+# conversation, so they are always left to the LLM
+FOLLOW_UP = re.compile(
+    r"^\s*(yes|yeah|yep|ok(ay)?|sure|confirm(ed)?|go ahead|do it|sounds good|no|nope)\b", re.I
+)
+
+# A reminder about deleting/cancelling something is ambiguous: leave it to the LLM
+REMINDER_CUE = re.compile(r"\bremind(er|ers)?\b", re.I)
+
+# "Cancel my 3pm meeting and book one at 5pm instead" removes and creates:
+# a delete with one of these has its confidence halved, so the LLM decides
+CREATE_CUE = re.compile(
+    r"\b(book|add|create|set up|reschedule|move|instead)\b|\bschedule (a|an|one|another|it)\b", re.I
+)
+MIXED_PENALTY = 0.5
+
+# Minimum share of the matched weight the winner needs to skip the LLM
+CONFIDENCE_THRESHOLD = 0.6
+
+_stats_lock = threading.Lock()
+_stats = {
+    "rule_hits": 0,
+    "llm_fallbacks": 0,
+    "rule_seconds": 0.0,
+    "llm_seconds": 0.0,
+}
+
+
+def classify_intent(text: str):
+    """
+    Score the message against RULES. Returns (task_type, confidence);
+    task_type is None when nothing matched.
+    """
+    if FOLLOW_UP.search(text):
+        return None, 0.0
+
+    scores = {}
+    for task_type, weight, pattern in RULES:
+        if pattern.search(text):
+            scores[task_type] = scores.get(task_type, 0) + weight
+
+    if not scores:
+        return None, 0.0
+    if "delete" in scores and REMINDER_CUE.search(text):
+        return None, 0.0
+    best = max(scores, key=scores.get)
+    confidence = scores[best] / sum(scores.values())
+    if best == "delete" and CREATE_CUE.search(text):
+        confidence *= MIXED_PENALTY
+    return best, confidence
+
+
+def record(source: str, seconds: float):
+    """Count one classification made by "rule" or "llm" and its latency"""
+    with _stats_lock:
+        if source == "rule":
+            _stats["rule_hits"] += 1
+            _stats["rule_seconds"] += seconds
+        else:
+            _stats["llm_fallbacks"] += 1
+            _stats["llm_seconds"] += seconds
+
+
+def classifier_stats():
+    """Hit rate of the rule fast path and mean latency of each path"""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["rule_hits"] + stats["llm_fallbacks"]
+    return {
+        **stats,
+        "total": total,
+        "hit_rate": stats["rule_hits"] / total if total else 0.0,
+        "rule_avg_ms": 1000 * stats["rule_seconds"] / stats["rule_hits"] if stats["rule_hits"] else 0.0,
+        "llm_avg_ms": 1000 * stats["llm_seconds"] / stats["llm_fallbacks"] if stats["llm_fallbacks"] else 0.0,
+    }
+
+
+# Phrase corpus: (text, expected task_type or None for an LLM fallback)
+CORPUS = [
+    ("delete my meeting on Friday", "delete"),
+    ("please remove the dentist appointment", "delete"),
+    ("can you cancel all my study sessions", "delete"),
+    ("what events do I have this week?", "get_event"),
+    ("study plan for 3 months before exams", "planner"),
+    ("remind me to call mom every Sunday", "reminder"),
+    ("remind me to cancel my gym membership on friday", None),
+    ("set a reminder to drop off the kids at 5pm", "reminder"),
+    ("remind me to clear my desk tomorrow", "reminder"),
+    ("yes, go ahead with this plan", None),
+    ("Drop off the kids at school at 8am tomorrow", None),
+    ("Clear my evening for a call with Sam", "reminder"),
+    ("add a plan review meeting at 3pm", "reminder"),
+    ("Cancel my 3pm meeting and book one at 5pm instead", None),
+    ("Plan my day with 3 hours of focused work", "planner"),
+    ("delete my study plan", "delete"),
+]
+
+
+if "__main__" == __name__:
+    failures = 0
+    for phrase, expected in CORPUS:
+        task_type, confidence = classify_intent(phrase)
+        got = task_type if confidence >= CONFIDENCE_THRESHOLD else None
+        status = "ok " if got == expected else "FAIL"
+        failures += got != expected
+        print(f"{status} {phrase!r:52} -> {got!r} (expected {expected!r})")
+    print(f"{len(CORPUS) - failures}/{len(CORPUS)} phrases classified as expected")
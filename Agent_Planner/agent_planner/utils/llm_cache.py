@@ -0,0 +1,139 @@
+# utils/llm_cache.py - Exact-match response cache for deterministic LLM calls
+
+from collections import OrderedDict, defaultdict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+# SQLite file (e.g. llm_cache.sqlite) to persist entries across restarts;
+# empty keeps them in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+# Nodes whose LLM calls go through the cache
+LLM_CACHE_NODES = {
+    node.strip() for node in os.getenv("LLM_CACHE_NODES", "classify_model,get_event").split(",")
+    if node.strip()
+}
+
+
+def cache_key(model_name: str, namespace: str, messages: list, scope: str = "") -> str:
+    """SHA-256 of everything that determines the response"""
+    payload = json.dumps(
+        [model_name, namespace, scope, [(m.type, m.content) for m in messages]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    LRU + TTL bounded map from cache_key to the model's response message,
+    optionally backed by a SQLite file. Only use it for calls whose output
+    is a function of the prompt (fixed system prompt, classification-style
+    answers); it never sees temperature or tool state.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL,
+                 path: str = LLM_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, message)
+        self._lock = threading.Lock()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._miss_seconds = defaultdict(float)
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, message TEXT NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE stored_at < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT stored_at, message FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[0] >= self.ttl:
+                return None
+            message = messages_from_dict([json.loads(row[1])])[0]
+            self._remember(key, row[0], message)
+            return message
+
+    def put(self, key: str, message):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, message)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, stored_at, message) VALUES (?, ?, ?)",
+                    (key, stored_at, json.dumps(messages_to_dict([message])[0])),
+                )
+                self._db.commit()
+
+    def _remember(self, key, stored_at, message):
+        self._entries[key] = (stored_at, message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invoke(self, model, messages: list, namespace: str, model_name: str, scope: str = ""):
+        """model.invoke(messages), answered from the cache when possible"""
+        key = cache_key(model_name, namespace, messages, scope)
+        cached = self.get(key)
+        if cached is not None:
+            with self._lock:
+                self._hits[namespace] += 1
+            return cached
+
+        started = time.perf_counter()
+        response = model.invoke(messages)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._misses[namespace] += 1
+            self._miss_seconds[namespace] += elapsed
+        self.put(key, response)
+        return response
+
+    def stats(self):
+        """Per-namespace hits, misses, hit rate and estimated seconds saved"""
+        with self._lock:
+            stats = {}
+            for namespace in set(self._hits) | set(self._misses):
+                hits, misses = self._hits[namespace], self._misses[namespace]
+                avg_miss = self._miss_seconds[namespace] / misses if misses else 0.0
+                stats[namespace] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": hits / (hits + misses),
+                    "remote_calls_saved": hits,
+                    "seconds_saved": hits * avg_miss,
+                }
+            return stats
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,288 @@
+# utils/local_memory.py - Embedded, single-node memory backend (no network)
+
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid as uuid_lib
+
+import numpy as np
+
+from utils.memory_store import (
+    MemoryStore,
+    USER_PREFERENCE,
+    CONVERSATION_MEMORY,
+    SCHEDULING_PATTERN,
+    NO_EMBEDDING,
+)
+
+LOCAL_MEMORY_DIR = os.getenv("LOCAL_MEMORY_DIR", "memory_data")
+EMBEDDING_DIM = 384
+INITIAL_CAPACITY = 64  # rows allocated per matrix file; doubled when full
+
+# Property that holds the text to embed, per collection
+EMBEDDED_PROPERTY = {
+    USER_PREFERENCE: "preferenceText",
+    CONVERSATION_MEMORY: "conversationText",
+    SCHEDULING_PATTERN: "patternDescription",
+}
+
+
+class HashingEmbedder:
+    """
+    Dependency-free default embedder: signed feature hashing of word
+    unigrams and bigrams, L2-normalised. Any callable mapping a list of
+    strings to an (n, dim) float array can be passed to LocalMemoryStore
+    instead, e.g. a sentence-transformers model's encode method.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = re.findall(r"\w+", text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                h = int.from_bytes(digest, "little")
+                vectors[row, h % self.dim] += 1.0 if h >> 63 else -1.0
+        return _normalize(vectors)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class VectorTable:
+    """
+    One collection of one user: a growable memory-mapped float32 matrix of
+    embeddings plus a JSON-lines log holding each row's UUID and properties.
+    A later log line for a UUID already seen updates that row in place.
+    """
+
+    def __init__(self, directory: Path, name: str, dim: int):
+        self.dim = dim
+        self.vectors_path = directory / f"{name}.f32"
+        self.meta_path = directory / f"{name}.jsonl"
+
+        self.rows = []
+        self._index = {}  # uuid -> row number
+        if self.meta_path.exists():
+            with open(self.meta_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._load_row(json.loads(line))
+
+        row_bytes = dim * np.dtype(np.float32).itemsize
+        existing = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        self._open(max(INITIAL_CAPACITY, existing, len(self.rows)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _load_row(self, row: dict):
+        if row["uuid"] in self._index:
+            self.rows[self._index[row["uuid"]]] = row
+        else:
+            self._index[row["uuid"]] = len(self.rows)
+            self.rows.append(row)
+
+    def _open(self, capacity: int):
+        """(Re)map the matrix file, growing it to `capacity` rows if needed"""
+        size = capacity * self.dim * np.dtype(np.float32).itemsize
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.capacity = capacity
+        self.matrix = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def append(self, vector: np.ndarray, properties: dict, object_id=None):
+        if len(self.rows) == self.capacity:
+            self.matrix.flush()
+            del self.matrix
+            self._open(self.capacity * 2)
+
+        object_id = str(object_id or uuid_lib.uuid4())
+        row = {"uuid": object_id, "properties": properties}
+
+        # Vector first: a row only exists once its metadata line is written
+        self.matrix[len(self.rows)] = vector
+        self.matrix.flush()
+        self._log(row)
+        self._load_row(row)
+        return object_id
+
+    def get(self, object_id):
+        """Properties of the row with this UUID, or None"""
+        position = self._index.get(str(object_id))
+        return None if position is None else self.rows[position]["properties"]
+
+    def update(self, object_id, properties: dict):
+        """Replace a row's properties; its vector is left untouched"""
+        row = {"uuid": str(object_id), "properties": properties}
+        self._log(row)
+        self._load_row(row)
+
+    def _log(self, row: dict):
+        with open(self.meta_path, "a") as f:
+            f.write(json.dumps(row) + "\n")
+
+    def search(self, query_vector: np.ndarray, limit: int, where: dict = None):
+        """Cosine top-k over all rows whose properties match every `where` item"""
+        count = len(self.rows)
+        if count == 0 or limit <= 0:
+            return []
+
+        scores = self.matrix[:count] @ query_vector
+        if where:
+            mask = np.fromiter(
+                (all(row["properties"].get(k) == v for k, v in where.items()) for row in self.rows),
+                dtype=bool,
+                count=count,
+            )
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(limit, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.rows[i]["properties"] for i in top if np.isfinite(scores[i])]
+
+    def close(self):
+        self.matrix.flush()
+
+
+class LocalMemoryStore(MemoryStore):
+    """
+    Embedded drop-in for WeaviateMemoryStore. Keeps the same three
+    collections per user under LOCAL_MEMORY_DIR and searches them with
+    vectorised cosine similarity on memory-mapped NumPy matrices.
+    """
+
+    def __init__(self, root: str = LOCAL_MEMORY_DIR, embedder=None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or HashingEmbedder()
+        self._dim = int(np.asarray(self.embedder(["dimension probe"])).shape[-1])
+        self._tables = {}
+        self._lock = threading.RLock()
+        print(f"✓ Local memory store ready: {self.root.resolve()}")
+
+    def _table(self, user_id: str, collection_name: str) -> VectorTable:
+        key = (user_id, collection_name)
+        if key not in self._tables:
+            directory = self.root / re.sub(r"[^\w-]", "_", user_id)
+            directory.mkdir(exist_ok=True)
+            self._tables[key] = VectorTable(directory, collection_name, self._dim)
+        return self._tables[key]
+
+    def embed_query(self, text: str):
+        return _normalize(self.embedder([text]))[0]
+
+    def _embed(self, collection_name: str, data_object: dict):
+        return _normalize(self.embedder([data_object[EMBEDDED_PROPERTY[collection_name]]]))[0]
+
+    def _insert(self, collection_name: str, data_object: dict, object_id=None):
+        vector = self._embed(collection_name, data_object)
+        with self._lock:
+            return self._table(data_object["userId"], collection_name).append(
+                vector, data_object, object_id
+            )
+
+    def _query(self, collection_name: str, user_id: str, query: str, limit: int,
+               query_vector=None, where: dict = None):
+        if query_vector is None or query_vector is NO_EMBEDDING:
+            query_vector = self.embed_query(query)  # local, never fails
+        query_vector = _normalize(query_vector)
+        with self._lock:
+            return self._table(user_id, collection_name).search(query_vector, limit, where)
+
+    def store_user_preference(self, user_id: str, preference_text: str,
+                              preference_type: str, preference_data: dict):
+        """Store user preference with a local embedding"""
+        data_object = self._preference_properties(
+            user_id, preference_text, preference_type, preference_data
+        )
+        uuid = self._insert(USER_PREFERENCE, data_object)
+        print(f"✓ Stored preference: {preference_type} (UUID: {uuid})")
+        return uuid
+
+    def get_relevant_preferences(self, user_id: str, query: str, limit: int = 5,
+                                 query_vector=None):
+        """Retrieve semantically similar preferences"""
+        found = self._query(USER_PREFERENCE, user_id, query, limit, query_vector)
+        return [self._preference_result(properties) for properties in found]
+
+    def store_conversation_turn(self, user_id: str, thread_id: str,
+                                user_message: str, assistant_response: str,
+                                task_type: str, successful: bool = True):
+        """Store conversation with a local embedding"""
+        data_object = self._conversation_properties(
+            user_id, thread_id, user_message, assistant_response, task_type, successful
+        )
+        uuid = self._insert(CONVERSATION_MEMORY, data_object)
+        print(f"✓ Stored conversation (UUID: {uuid})")
+        return uuid
+
+    def retrieve_similar_conversations(self, user_id: str, current_context: str,
+                                       limit: int = 3, query_vector=None):
+        """Find semantically similar past conversations"""
+        found = self._query(CONVERSATION_MEMORY, user_id, current_context, limit, query_vector)
+        return [self._conversation_result(properties) for properties in found]
+
+    def store_scheduling_pattern(self, user_id: str, pattern_description: str,
+                                 task_type: str, task_data: dict):
+        """Upsert scheduling pattern; only new patterns are embedded"""
+        data_object = self._pattern_properties(
+            user_id, pattern_description, task_type, task_data
+        )
+        uuid = self._pattern_uuid(data_object)
+
+        with self._lock:
+            if self._bump_pattern(user_id, uuid, data_object):
+                return str(uuid)
+
+        # Embed without holding the lock, then check again: a concurrent call
+        # may have stored the same pattern meanwhile
+        vector = self._embed(SCHEDULING_PATTERN, data_object)
+        with self._lock:
+            if self._bump_pattern(user_id, uuid, data_object):
+                return str(uuid)
+            uuid = self._table(user_id, SCHEDULING_PATTERN).append(vector, data_object, uuid)
+        print(f"✓ Stored scheduling pattern (UUID: {uuid})")
+        return uuid
+
+    def _bump_pattern(self, user_id: str, uuid, data_object: dict) -> bool:
+        """Count one more use of a stored pattern; False if it isn't stored. Caller holds _lock."""
+        table = self._table(user_id, SCHEDULING_PATTERN)
+        existing = table.get(uuid)
+        if existing is None:
+            return False
+        table.update(uuid, {
+            **existing,
+            "frequency": existing.get("frequency", 1) + 1,
+            "timestamp": data_object["timestamp"]
+        })
+        print(f"✓ Updated scheduling pattern (UUID: {uuid})")
+        return True
+
+    def find_similar_patterns(self, user_id: str, task_description: str,
+                              limit: int = 5, query_vector=None):
+        """Find similar past scheduling decisions"""
+        found = self._query(SCHEDULING_PATTERN, user_id, task_description, limit, query_vector)
+        return [self._pattern_result(properties) for properties in found]
+
+    def close(self):
+        """Flush all memory-mapped matrices"""
+        with self._lock:
+            for table in self._tables.values():
+                table.close()
+            self._tables.clear()
+        print("✓ Local memory store closed")
@@ -0,0 +1,148 @@
+# utils/memory_compaction.py - Offline compaction/retention job for ConversationMemory
+#
+# Run on a schedule (e.g. nightly cron):
+#     python -m utils.memory_compaction --retention-days 30 --max-per-user 200
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import argparse
+
+DIGEST_TASK_TYPE = "digest"
+DIGEST_MAX_LINES = 20  # turns listed in a digest before "... and N more"
+
+
+def _as_datetime(value):
+    """Timestamps come back as datetime from Weaviate and as ISO strings elsewhere"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        dt = datetime.fromisoformat(str(value))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def build_digest(user_id: str, thread_id: str, turns: list, summarizer=None):
+    """
+    Fold a thread's old turns (properties dicts, oldest first) into one
+    ConversationMemory object. `summarizer`, if given, maps the turns to the
+    digest text (e.g. an LLM call); the default is an extractive list.
+    """
+    first = _as_datetime(turns[0]["timestamp"])
+    last = _as_datetime(turns[-1]["timestamp"])
+
+    if summarizer is not None:
+        text = summarizer(turns)
+    else:
+        lines = [
+            f"- [{turn.get('taskType', 'unknown')}] {turn.get('userMessage', '')[:100]}"
+            for turn in turns[:DIGEST_MAX_LINES]
+        ]
+        if len(turns) > DIGEST_MAX_LINES:
+            lines.append(f"... and {len(turns) - DIGEST_MAX_LINES} more")
+        text = (
+            f"Summary of {len(turns)} earlier turns "
+            f"({first.date().isoformat()} to {last.date().isoformat()}):\n" + "\n".join(lines)
+        )
+
+    return {
+        "userId": user_id,
+        "threadId": thread_id,
+        "conversationText": text,
+        "userMessage": "; ".join(turn.get("userMessage", "") for turn in turns)[:500],
+        "assistantMessage": f"Digest of {len(turns)} turns",
+        "taskType": DIGEST_TASK_TYPE,
+        "successful": True,
+        "timestamp": last.isoformat(),
+    }
+
+
+def plan_compaction(objects, now=None, retention_days: int = 30,
+                    max_per_user: int = 200, summarizer=None):
+    """
+    Decide what to write and delete, without touching the store.
+
+    objects: iterable of (uuid, properties) for every ConversationMemory turn.
+    Turns older than `retention_days` are folded into one digest per user and
+    thread and deleted. If a user still has more than `max_per_user` entries
+    (turns plus digests), the oldest are dropped.
+
+    Returns (digests_to_insert, uuids_to_delete).
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=retention_days)
+
+    by_user = defaultdict(list)
+    for object_id, properties in objects:
+        by_user[properties.get("userId", "")].append((object_id, properties))
+
+    digests, to_delete = [], []
+    for user_id, rows in by_user.items():
+        rows.sort(key=lambda row: _as_datetime(row[1]["timestamp"]))
+
+        old_by_thread = defaultdict(list)
+        kept = []  # (timestamp, uuid or None for a new digest, properties)
+        for object_id, properties in rows:
+            ts = _as_datetime(properties["timestamp"])
+            if ts < cutoff and properties.get("taskType") != DIGEST_TASK_TYPE:
+                old_by_thread[properties.get("threadId", "")].append(properties)
+                to_delete.append(object_id)
+            else:
+                kept.append((ts, object_id, properties))
+
+        for thread_id, turns in old_by_thread.items():
+            digest = build_digest(user_id, thread_id, turns, summarizer)
+            kept.append((_as_datetime(digest["timestamp"]), None, digest))
+
+        # Per-user cap: keep the newest entries
+        kept.sort(key=lambda entry: entry[0])
+        overflow = max(0, len(kept) - max_per_user)
+        for _, object_id, _ in kept[:overflow]:
+            if object_id is not None:
+                to_delete.append(object_id)
+        digests.extend(properties for _, object_id, properties in kept[overflow:] if object_id is None)
+
+    return digests, to_delete
+
+
+def compact_conversations(store, retention_days: int = 30, max_per_user: int = 200,
+                          summarizer=None, dry_run: bool = False):
+    """Run one compaction pass against a WeaviateMemoryStore"""
+    digests, to_delete = plan_compaction(
+        store.iter_conversation_memory(),
+        retention_days=retention_days,
+        max_per_user=max_per_user,
+        summarizer=summarizer,
+    )
+    print(f"Compaction plan: {len(digests)} digests to write, {len(to_delete)} turns to delete")
+
+    if dry_run:
+        return len(digests), len(to_delete)
+
+    # Digests are written synchronously first; the originals are only
+    # deleted once every digest has landed, so a failed run loses nothing
+    if digests and not store.insert_conversation_memory(digests):
+        print("✗ Digests not written, skipping deletes; history left untouched")
+        return 0, 0
+    if to_delete:
+        store.delete_conversation_memory(to_delete)
+    return len(digests), len(to_delete)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact ConversationMemory in Weaviate")
+    parser.add_argument("--retention-days", type=int, default=30)
+    parser.add_argument("--max-per-user", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from utils.weaviate_memory import WeaviateMemoryStore
+
+    memory_store = WeaviateMemoryStore()
+    try:
+        compact_conversations(
+            memory_store,
+            retention_days=args.retention_days,
+            max_per_user=args.max_per_user,
+            dry_run=args.dry_run,
+        )
+    finally:
+        memory_store.close()
@@ -1,20 +1,46 @@
 # utils/memory_nodes.py - Memory retrieval and storage nodes with lazy init
 
 from utils.state import AgentState
+from utils.memory_store import NO_EMBEDDING
 from langchain_core.messages import HumanMessage, AIMessage
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+import os
+import threading
+import time
 import traceback
 
 # Lazy initialization - don't create connection until first use
 _memory_store = None
+# Gradio serves users from several worker threads; only one may create the store
+_memory_store_lock = threading.Lock()
+
+# "weaviate" (Weaviate Cloud + Cohere) or "local" (embedded NumPy store, no network)
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "weaviate")
+
+# The three collection queries run side by side; each gets the same time budget
+MEMORY_QUERY_TIMEOUT = float(os.getenv("MEMORY_QUERY_TIMEOUT", "2.0"))
+# Shared by all concurrent turns: three lookups per turn
+MEMORY_RETRIEVAL_WORKERS = int(os.getenv("MEMORY_RETRIEVAL_WORKERS", "12"))
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=MEMORY_RETRIEVAL_WORKERS, thread_name_prefix="memory-retrieval"
+)
 
 def get_memory_store():
-    """Lazy initialization of memory store"""
+    """Lazy, thread-safe initialization of the shared memory store"""
     global _memory_store
-    if _memory_store is None:
+    if _memory_store is not None:
+        return _memory_store if _memory_store is not False else None
+    with _memory_store_lock:
+        if _memory_store is not None:  # created by another thread meanwhile
+            return _memory_store if _memory_store is not False else None
         try:
-            from utils.weaviate_memory import WeaviateMemoryStore
-            _memory_store = WeaviateMemoryStore()
-            print("✓ Memory store initialized")
+            if MEMORY_BACKEND == "local":
+                from utils.local_memory import LocalMemoryStore
+                _memory_store = LocalMemoryStore()
+            else:
+                from utils.weaviate_memory import WeaviateMemoryStore
+                _memory_store = WeaviateMemoryStore()
+            print(f"✓ Memory store initialized ({MEMORY_BACKEND})")
         except Exception as e:
             print(f"✗ Memory store initialization failed: {e}")
             _memory_store = False  # Mark as failed to avoid retrying
@@ -26,13 +52,32 @@ def memory_store():
     return get_memory_store()
 
 
+def _gather_within_budget(futures: dict, deadline: float) -> dict:
+    """Wait for all futures up to a shared monotonic deadline; late or failed ones yield []"""
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeout:
+            future.cancel()
+            print(f"⚠ Memory retrieval timed out: {name}")
+            results[name] = []
+        except Exception as e:
+            print(f"⚠ Memory retrieval error ({name}): {e}")
+            results[name] = []
+    return results
+
+
 def retrieve_semantic_memory(state: AgentState) -> AgentState:
-    """Retrieve relevant memories from Weaviate before processing"""
+    """
+    Retrieve relevant memories from the memory store before processing.
+    Runs as a parallel branch, so it only returns the keys it sets.
+    """
     
     store = get_memory_store()
     if store is None:
         print("⚠ Memory store not available, skipping retrieval")
-        return state
+        return {}
     
     user_id = state.get("user_id", "default_user")
     messages = state["messages"]
@@ -46,31 +91,56 @@ def retrieve_semantic_memory(state: AgentState) -> AgentState:
     recent_context = recent_context.strip()
     
     if not recent_context:
-        return state
+        return {}
     
     try:
-        preferences = store.get_relevant_preferences(
-            user_id=user_id,
-            query=recent_context,
-            limit=3
-        )
-        
-        similar_convos = store.retrieve_similar_conversations(
-            user_id=user_id,
-            current_context=recent_context,
-            limit=2
-        )
+        # Embed once (cached) and search all three collections with the same
+        # vector. The embedding shares the MEMORY_QUERY_TIMEOUT budget; if it
+        # fails or is late, the searches skip straight to near_text.
+        deadline = time.monotonic() + MEMORY_QUERY_TIMEOUT
+        embed_future = _retrieval_pool.submit(store.embed_query, recent_context)
+        try:
+            query_vector = embed_future.result(timeout=MEMORY_QUERY_TIMEOUT)
+        except FuturesTimeout:
+            print("⚠ Query embedding timed out, searching without a vector")
+            query_vector = None
+        except Exception as e:
+            print(f"⚠ Query embedding error: {e}")
+            query_vector = None
+        if query_vector is None:
+            query_vector = NO_EMBEDDING
         
-        patterns = store.find_similar_patterns(
-            user_id=user_id,
-            task_description=recent_context,
-            limit=3
-        )
+        futures = {
+            "preferences": _retrieval_pool.submit(
+                store.get_relevant_preferences,
+                user_id=user_id,
+                query=recent_context,
+                limit=3,
+                query_vector=query_vector
+            ),
+            "conversations": _retrieval_pool.submit(
+                store.retrieve_similar_conversations,
+                user_id=user_id,
+                current_context=recent_context,
+                limit=2,
+                query_vector=query_vector
+            ),
+            "patterns": _retrieval_pool.submit(
+                store.find_similar_patterns,
+                user_id=user_id,
+                task_description=recent_context,
+                limit=3,
+                query_vector=query_vector
+            ),
+        }
+        results = _gather_within_budget(futures, deadline)
+        preferences = results["preferences"]
+        similar_convos = results["conversations"]
+        patterns = results["patterns"]
         
         print(f"✓ Retrieved: {len(preferences)} prefs, {len(similar_convos)} convos, {len(patterns)} patterns")
         
         return {
-            **state,
             "relevant_preferences": preferences,
             "similar_conversations": similar_convos,
             "scheduling_patterns": patterns
@@ -78,11 +148,11 @@ def retrieve_semantic_memory(state: AgentState) -> AgentState:
     
     except Exception as e:
         print(f"⚠ Memory retrieval error: {e}")
-        return state
+        return {}
 
 
 def store_interaction_memory(state: AgentState) -> AgentState:
-    """Store completed interaction in Weaviate for future learning"""
+    """Store completed interaction in the memory store for future learning"""
     
     store = get_memory_store()
     if store is None:
@@ -137,7 +207,7 @@ def store_interaction_memory(state: AgentState) -> AgentState:
                         task_data=task
                     )
                 
-                print(f"✓ Stored {len(tasks)} scheduling patterns")
+                print(f"✓ Queued {len(tasks)} scheduling patterns")
         
         return state
     
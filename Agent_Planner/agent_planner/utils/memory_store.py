@@ -0,0 +1,170 @@
+# utils/memory_store.py - Backend-agnostic interface for semantic memory
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import json
+import uuid as uuid_lib
+
+# Collections every backend keeps, with the same property names
+USER_PREFERENCE = "UserPreference"
+CONVERSATION_MEMORY = "ConversationMemory"
+SCHEDULING_PATTERN = "SchedulingPattern"
+
+# Passed as query_vector when embedding the query failed or ran out of
+# time: backends search without a vector instead of embedding again
+NO_EMBEDDING = object()
+
+
+class MemoryStore(ABC):
+    """
+    Common interface of the memory backends used by utils/memory_node.py.
+    Subclasses only handle storage and vector search; building the stored
+    properties and shaping search results is shared here so every backend
+    returns the same dicts.
+    """
+
+    def _get_rfc3339_timestamp(self):
+        """Generate RFC 3339 compliant timestamp with timezone"""
+        return datetime.now(timezone.utc).isoformat()
+
+    # ---------- stored properties ----------
+
+    def _preference_properties(self, user_id: str, preference_text: str,
+                               preference_type: str, preference_data: dict):
+        return {
+            "userId": user_id,
+            "preferenceText": preference_text,
+            "preferenceType": preference_type,
+            "preferenceData": json.dumps(preference_data),
+            "timestamp": self._get_rfc3339_timestamp()
+        }
+
+    def _conversation_properties(self, user_id: str, thread_id: str,
+                                 user_message: str, assistant_response: str,
+                                 task_type: str, successful: bool = True):
+        conversation_text = f"""
+        User asked: {user_message}
+        Assistant responded: {assistant_response}
+        Task was: {task_type}
+        """
+
+        return {
+            "userId": user_id,
+            "threadId": thread_id,
+            "conversationText": conversation_text.strip(),
+            "userMessage": user_message,
+            "assistantMessage": assistant_response,
+            "taskType": task_type,
+            "successful": successful,
+            "timestamp": self._get_rfc3339_timestamp()
+        }
+
+    def _pattern_properties(self, user_id: str, pattern_description: str,
+                            task_type: str, task_data: dict):
+        # FIXED: Convert all fields to strings explicitly
+        preferred_time = task_data.get("start", "")
+        if isinstance(preferred_time, dict):
+            # If it's a dict (like {'dateTime': '...', 'timeZone': '...'}), extract the datetime
+            preferred_time = preferred_time.get("dateTime", str(preferred_time))
+        preferred_time = str(preferred_time) if preferred_time else ""
+
+        task_summary = task_data.get("summary", "")
+        task_summary = str(task_summary) if task_summary else ""
+
+        day_pattern = task_data.get("day_pattern", "weekday")
+        day_pattern = str(day_pattern) if day_pattern else "weekday"
+
+        duration = task_data.get("duration", 60)
+        try:
+            duration = int(duration)
+        except (ValueError, TypeError):
+            duration = 60
+
+        return {
+            "userId": user_id,
+            "patternDescription": pattern_description,
+            "taskType": task_type,
+            "taskSummary": task_summary,
+            "preferredTime": preferred_time,  # Now guaranteed to be string
+            "duration": duration,              # Now guaranteed to be int
+            "dayPattern": day_pattern,         # Now guaranteed to be string
+            "frequency": 1,
+            "timestamp": self._get_rfc3339_timestamp()
+        }
+
+    @staticmethod
+    def _pattern_uuid(properties: dict):
+        """
+        Deterministic ID for a scheduling pattern (user + summary + start), so
+        the same task seen again maps to the same object and is upserted.
+        """
+        key = f"{properties['userId']}|{properties['taskSummary']}|{properties['preferredTime']}"
+        return uuid_lib.uuid5(uuid_lib.NAMESPACE_URL, key)
+
+    # ---------- search results ----------
+
+    @staticmethod
+    def _preference_result(properties: dict):
+        return {
+            "text": properties["preferenceText"],
+            "type": properties["preferenceType"],
+            "data": json.loads(properties["preferenceData"]),
+            "timestamp": properties["timestamp"]
+        }
+
+    @staticmethod
+    def _conversation_result(properties: dict):
+        return {
+            "user_message": properties["userMessage"],
+            "assistant_message": properties["assistantMessage"],
+            "task_type": properties["taskType"],
+            "timestamp": properties["timestamp"]
+        }
+
+    @staticmethod
+    def _pattern_result(properties: dict):
+        return {
+            "description": properties["patternDescription"],
+            "task_type": properties["taskType"],
+            "preferred_time": properties["preferredTime"],
+            "duration": properties["duration"],
+            "day_pattern": properties["dayPattern"]
+        }
+
+    # ---------- backend API ----------
+
+    @abstractmethod
+    def embed_query(self, text: str):
+        """Embed a search query; the vector can be passed to every search method"""
+
+    @abstractmethod
+    def store_user_preference(self, user_id: str, preference_text: str,
+                              preference_type: str, preference_data: dict): ...
+
+    @abstractmethod
+    def get_relevant_preferences(self, user_id: str, query: str, limit: int = 5,
+                                 query_vector=None): ...
+
+    @abstractmethod
+    def store_conversation_turn(self, user_id: str, thread_id: str,
+                                user_message: str, assistant_response: str,
+                                task_type: str, successful: bool = True): ...
+
+    @abstractmethod
+    def retrieve_similar_conversations(self, user_id: str, current_context: str,
+                                       limit: int = 3, query_vector=None): ...
+
+    @abstractmethod
+    def store_scheduling_pattern(self, user_id: str, pattern_description: str,
+                                 task_type: str, task_data: dict): ...
+
+    @abstractmethod
+    def find_similar_patterns(self, user_id: str, task_description: str,
+                              limit: int = 5, query_vector=None): ...
+
+    def flush(self, timeout: float = None):
+        """Block until pending writes are stored; no-op for synchronous backends"""
+        return True
+
+    def close(self):
+        """Release connections and files"""
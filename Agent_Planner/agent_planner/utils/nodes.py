@@ -1,18 +1,68 @@
-from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, RemoveMessage
 from datetime import datetime, timezone, timedelta
-from langchain.chat_models import init_chat_model
 from .state import AgentState
-from .tools import create_event, get_events, delete_event,google_cal
+from .tools import create_event, get_events, delete_event, delete_events, plan_sessions, google_cal
+from .google_calendar import format_intervals_by_day, invert_intervals
+from .intent import classify_intent, record, CONFIDENCE_THRESHOLD
+from .period import parse_period
+from .history import split_history, summarize, prompt_history
+from .llm_cache import LLMCache, LLM_CACHE_NODES
+import os
+import threading
+import time
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-tools = [create_event, get_events, delete_event]
-llm = init_chat_model("groq:openai/gpt-oss-20b").bind_tools(
-    tools
-)
+# Seconds a thread may reuse its fetched events before refetching; our own
+# writes always force a refetch, this only bounds edits made elsewhere
+EVENTS_REUSE_TTL = float(os.getenv("EVENTS_REUSE_TTL", "300"))
+
+tools = [create_event, get_events, delete_event, delete_events, plan_sessions]
+LLM_MODEL = "groq:openai/gpt-oss-20b"
+llm_cache = LLMCache()
+
+# Lazy initialization - the chat model client is built on the first LLM call,
+# so importing the graph (tests, visualization) does no client setup
+_base_llm = None
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm(with_tools: bool = True):
+    """The chat model, bound to the calendar tools unless with_tools=False"""
+    global _base_llm, _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain.chat_models import init_chat_model
+                _base_llm = init_chat_model(LLM_MODEL)
+                _llm = _base_llm.bind_tools(tools)
+    return _llm if with_tools else _base_llm
+
+
+def invoke_llm(node: str, messages: list, scope: str = ""):
+    """llm.invoke for `node`, through llm_cache when the node is in LLM_CACHE_NODES"""
+    if node in LLM_CACHE_NODES:
+        return llm_cache.invoke(get_llm(), messages, namespace=node, model_name=LLM_MODEL, scope=scope)
+    return get_llm().invoke(messages)
+
+
+def _last_exchange(state: AgentState) -> list:
+    """
+    The latest user message, preceded by the assistant message it answers
+    (if any). Enough context for a follow-up like "yes, go ahead", and small
+    enough that repeated phrasings hit the LLM cache.
+    """
+    messages = state["messages"]
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            if i > 0 and isinstance(messages[i - 1], AIMessage) and messages[i - 1].content:
+                return [AIMessage(content=messages[i - 1].content), HumanMessage(content=messages[i].content)]
+            return [HumanMessage(content=messages[i].content)]
+    return []
 
 
 MAIN_SYSTEM_PROMPT = """
@@ -71,16 +121,17 @@ Examples:
 """
 
 PLANNER_PROMPT = """
-Context: {events}
+Free time in the calendar ({window}), per day, times in +05:30:
+{free}
 
 Role: You are a planner that builds multi-day time-blocked schedules before deadlines.
 
 Procedure (strict):
 1. Extract goal, deadline, and milestones from the user text.
 2. If missing: ask for available hours/day, topics/milestones, and hard deadlines — do not proceed until you have them.
-3. Inspect {events} to find free, non-overlapping slots before the deadline.
-4. Propose a balanced plan (daily or weekly) listing each session: topic → date → start_time → end_time (ISO +05:30).
-5. Do NOT create calendar events yet. Present the plan and any tradeoffs.
+3. Once you have them, call plan_sessions(topics, deadline, hours_per_day, work_start, work_end, session_minutes). It computes the non-overlapping sessions in the free time above; do not work out slots yourself.
+4. Present the returned plan (daily or weekly) listing each session: topic → date → start_time → end_time (ISO +05:30).
+5. Do NOT create calendar events yet. Present the plan and any tradeoffs (e.g. fewer sessions than hoped).
 
 Confirmation rule:
 - When user explicitly confirms (e.g., "yes", "okay", "go ahead with this plan"), reply exactly: CONFIRM
@@ -115,14 +166,30 @@ All Events: {events}
 3.  If you are unsure which events to delete, ask for clarification.
 4.  Before deleting, ask for confirmation from the user.
 5.  call the delete_event node
-6.  When user explicitly confirms (e.g., "yes", "okay", "go ahead with this plan"), call the `delete_event` tool for each `event_id`.
+6.  When user explicitly confirms (e.g., "yes", "okay", "go ahead with this plan"), call the `delete_events` tool once with all the `event_id`s (use `delete_event` for a single event).
 """
 
 
 def get_current_time(state: AgentState) -> AgentState:
     ist = timezone(timedelta(hours=5, minutes=30))
-    state["current_time"] = datetime.now(ist).isoformat()
-    return state
+    # tasks only holds events fetched during this turn (see get_events_node)
+    return {"current_time": datetime.now(ist).isoformat(), "tasks": []}
+
+
+def compact_history(state: AgentState):
+    """
+    Keep the thread within HISTORY_TOKEN_BUDGET: once it is exceeded, older
+    turns are folded into the rolling summary and removed from the state.
+    """
+    old, recent = split_history(state["messages"])
+    if not old:
+        return {}
+    summary = summarize(get_llm(with_tools=False), state.get("summary", ""), old)
+    print(f"✓ Folded {len(old)} messages into the summary, keeping {len(recent)}")
+    return {
+        "messages": [RemoveMessage(id=m.id) for m in old],
+        "summary": summary,
+    }
 
 
 def human_feedback(state: AgentState):
@@ -134,6 +201,13 @@ def should_continue(state: AgentState):
         return "tool"
     return "human_feedback"
 
+def route_schedule(state: AgentState):
+    """Like should_continue, but plan_sessions calls go back to the planner"""
+    last = state["messages"][-1]
+    if last.tool_calls and all(call["name"] == "plan_sessions" for call in last.tool_calls):
+        return "plan"
+    return should_continue(state)
+
 def model(state: AgentState):
     """Enhanced model with memory context"""
     
@@ -165,17 +239,34 @@ def model(state: AgentState):
         current_time=state["current_time"]
     ) + memory_context
     
-    messages = [SystemMessage(content=enhanced_prompt)] + state["messages"]
-    response = llm.invoke(messages)
+    messages = [SystemMessage(content=enhanced_prompt)] + prompt_history(state)
+    response = get_llm().invoke(messages)
     
     return {"messages": [response]}
 
 
 def classify_model(state: AgentState) -> AgentState:
+    # Fast path: obvious requests are classified by keyword rules, no LLM call
+    started = time.perf_counter()
+    last_human = next(
+        (m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), ""
+    )
+    task_type, confidence = classify_intent(last_human)
+    if task_type is not None and confidence >= CONFIDENCE_THRESHOLD:
+        record("rule", time.perf_counter() - started)
+        return {"task_type": task_type}
+
     sys_mess = SystemMessage(content=CLASSIFY_PROMPT)
     # Expect exactly "planner" or "reminder" or "delete"
-    state["task_type"] = llm.invoke([sys_mess] + state["messages"]).content.strip()
-    return state
+    task_type = invoke_llm("classify_model", [sys_mess] + _last_exchange(state)).content.strip()
+    record("llm", time.perf_counter() - started)
+    # Partial update: runs in parallel with retrieve_memory
+    return {"task_type": task_type}
+
+
+def join_context(state: AgentState):
+    """Barrier after the parallel retrieve_memory / classify_model branches; get_event runs after it"""
+    return {}
 
 
 def route_classifier(state: AgentState):
@@ -193,28 +284,68 @@ def route_classifier(state: AgentState):
 
 
 def get_events_node(state: AgentState):
-    sys_mess = SystemMessage(content=GET_EVENTS_EXTRACTOR_PROMPT)
-    period = llm.invoke([sys_mess] + state["messages"]).content.strip()
+    """
+    Only reached on the planner, delete and get_event routes. Follow-up
+    turns that don't name a new period keep the thread's previous one, and
+    reuse its fetched events unless they are stale.
+    """
+    last_human = next(
+        (m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage)), ""
+    )
+    # Deterministic parse first; the LLM only sees phrasings it can't handle
+    period = parse_period(last_human, default=state.get("period") or "10d")
+    if period is None:
+        sys_mess = SystemMessage(content=GET_EVENTS_EXTRACTOR_PROMPT)
+        # The period is in the latest message; relative dates depend on the day
+        period = invoke_llm(
+            "get_event",
+            [sys_mess, HumanMessage(content=last_human)],
+            scope=datetime.now().date().isoformat(),
+        ).content.strip()
     # Fallback safety
     if not period:
         period = "10d"
+
+    window = state.get("events_window") or {}
+    if (
+        window.get("period") == period
+        and window.get("write_count") == google_cal.write_count
+        and time.time() - window.get("fetched_at", 0) < EVENTS_REUSE_TTL
+    ):
+        print(f"✓ Reusing {len(window['events'])} events fetched for {period}")
+        return {"tasks": window["events"], "period": period}
+
     events = google_cal.get_events(period)
-    state["tasks"] = events
-    return state
+    return {
+        "tasks": events,
+        "period": period,
+        "events_window": {
+            "period": period,
+            "events": events,
+            "fetched_at": time.time(),
+            "write_count": google_cal.write_count,
+        },
+    }
 
 
 def model_schedule(state: AgentState) -> AgentState:
-    sys_mess = SystemMessage(content=PLANNER_PROMPT.format(events=state.get("tasks", [])))
-    state["messages"] = llm.invoke([sys_mess] + state["messages"])
+    # Busy/free intervals instead of the full event list: far fewer prompt tokens
+    start, end, busy = google_cal.get_busy_intervals(state.get("period") or "10d")
+    free = invert_intervals(busy, start, end)
+    sys_mess = SystemMessage(content=PLANNER_PROMPT.format(
+        window=f"{start.strftime('%Y-%m-%d %H:%M')} to {end.strftime('%Y-%m-%d %H:%M')}",
+        free=format_intervals_by_day(free) or "none",
+    ))
+    state["messages"] = get_llm().invoke([sys_mess] + prompt_history(state))
     return state
 
 
 def model_add(state: AgentState) -> AgentState:
     sys_mess = SystemMessage(content=EVENT_CREATION_PROMPT)
-    state["messages"] = llm.invoke([sys_mess] + state["messages"])
+    state["messages"] = get_llm().invoke([sys_mess] + prompt_history(state))
     return state
 
 def model_delete(state: AgentState) -> AgentState:
     sys_mess = SystemMessage(content=DELETE_PROMPT.format(events=state.get("tasks", [])))
-    state["messages"] = llm.invoke([sys_mess] + state["messages"])
+    state["messages"] = get_llm().invoke([sys_mess] + prompt_history(state))
     return state
\ No newline at end of file
@@ -0,0 +1,218 @@
+# utils/period.py - Deterministic natural-language period parser for get_events_node
+
+from datetime import date, timedelta
+import re
+
+DEFAULT_PERIOD = "10d"
+
+WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "couple of": 2, "few": 3,
+}
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+        ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+        ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+    ], start=1)
+    for name in names
+}
+# Fixed-date holidays; movable ones (Diwali, Easter, ...) are left to the LLM
+HOLIDAYS = {
+    r"christmas\s+eve": (12, 24),
+    r"christmas|xmas": (12, 25),
+    r"new\s+year'?s?\s+eve": (12, 31),
+    r"new\s+year'?s?(\s+day)?": (1, 1),
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_NUM = r"(\d+|" + "|".join(sorted(WORD_NUMBERS, key=len, reverse=True)) + r")"
+_MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+# Month names that count without a preposition ("my March sessions"); not
+# abbreviations, and not "may", which is usually the verb
+_BARE_MONTH = r"(" + "|".join(name for name in MONTHS if len(name) > 3) + r")"
+
+# Words that mean the user did ask for a period; if we then can't parse it,
+# the LLM gets to try instead of silently using the default
+TEMPORAL_CUE = re.compile(
+    r"\b(until|till|til|through|thru|before|upto|up to|"
+    r"days?|weeks?|months?|years?|weekend|today|tomorrow|tonight|fortnight|quarter|"
+    r"christmas|xmas|diwali|deepavali|holi|eid|pongal|onam|easter|thanksgiving|halloween)\b|"
+    r"\b" + _MONTH + r"\s+\d|\d\s+" + _MONTH + r"|\d{1,4}[-/]\d{1,2}|"
+    r"\b" + _BARE_MONTH + r"\b|\b\d{1,2}(st|nd|rd|th)\b",
+    re.I,
+)
+
+
+def _number(token: str) -> int:
+    token = token.lower()
+    return int(token) if token.isdigit() else WORD_NUMBERS[token]
+
+
+def _future_date(month: int, day: int, year, today: date) -> date:
+    """Date for "Dec 31" style input; without a year, the next occurrence"""
+    if year is not None:
+        year = int(year)
+        return date(year + 2000 if year < 100 else year, month, day)
+    candidate = date(today.year, month, day)
+    return candidate if candidate >= today else date(today.year + 1, month, day)
+
+
+def _month_end(month: int, today: date) -> date:
+    """Last day of the next occurrence of `month` (this month included)"""
+    year = today.year if month >= today.month else today.year + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def _explicit_date(text: str, today: date):
+    """First explicit calendar date in the text, or None"""
+    m = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", text)
+    if m:
+        return date(int(m[1]), int(m[2]), int(m[3]))
+
+    # Day-first numeric dates (31/12/2025, 31-12-25), as written in India
+    m = re.search(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b", text)
+    if m:
+        return _future_date(int(m[2]), int(m[1]), m[3], today)
+
+    m = re.search(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4}))?\b", text, re.I)
+    if m:
+        return _future_date(MONTHS[m[2].lower()], int(m[1]), m[3], today)
+
+    m = re.search(r"\b" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b", text, re.I)
+    if m:
+        return _future_date(MONTHS[m[1].lower()], int(m[2]), m[3], today)
+
+    # "on the 15th" -> the next 15th of a month
+    m = re.search(r"\b(?:on|by|until|till|til|through|thru|before|to)\s+(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)\b", text)
+    if m:
+        day = int(m[1])
+        if day >= today.day:
+            return date(today.year, today.month, day)
+        return date(today.year + today.month // 12, today.month % 12 + 1, day)
+
+    for pattern, (month, day) in HOLIDAYS.items():
+        if re.search(r"\b(?:" + pattern + r")\b", text):
+            return _future_date(month, day, None, today)
+
+    # "until March", "in December", "my March sessions" -> end of that month
+    m = re.search(r"\b(?:until|till|til|through|by|before|end of|in|during|for)\s+" + _MONTH + r"\b", text, re.I)
+    if m:
+        return _month_end(MONTHS[m[1].lower()], today)
+    m = re.search(r"\b" + _BARE_MONTH + r"\b", text, re.I)
+    if m:
+        return _month_end(MONTHS[m[1].lower()], today)
+
+    return None
+
+
+def parse_period(text: str, today: date = None, default: str = DEFAULT_PERIOD):
+    """
+    Map a request to the get_events max_period token ("Nd", "Nm" or
+    "YYYY-MM-DD"), following GET_EVENTS_EXTRACTOR_PROMPT's rules.
+
+    Returns `default` when the text mentions no period at all (e.g. a
+    follow-up like "yes, go ahead"), and None when it seems to mention one
+    that could not be parsed.
+    """
+    today = today or date.today()
+    lowered = text.lower()
+
+    try:
+        explicit = _explicit_date(lowered, today)
+    except ValueError:  # e.g. "31/02/2025"
+        return None
+    if explicit is not None:
+        return explicit.isoformat()
+
+    m = re.search(r"\b(?:next|coming|following|upcoming)?\s*" + _NUM + r"\s+(day|week|month|year)s?\b", lowered)
+    if m:
+        n, unit = _number(m[1]), m[2]
+        return {"day": f"{n}d", "week": f"{7 * n}d", "month": f"{n}m", "year": f"{12 * n}m"}[unit]
+
+    if re.search(r"\bweek\s+after\s+next\b", lowered):
+        end_of_week = today + timedelta(days=6 - today.weekday())
+        return (end_of_week + timedelta(days=14)).isoformat()
+    if re.search(r"\b(next|this|coming)\s+week\b|\bweek\b", lowered):
+        return "7d"
+    if re.search(r"\bfortnight\b", lowered):
+        return "14d"
+    if re.search(r"\bthis\s+month\b", lowered):
+        return "30d"
+    if re.search(r"\b(next|coming)\s+month\b|\bmonth\b", lowered):
+        return "1m"
+    if re.search(r"\b(next|this|coming)\s+quarter\b", lowered):
+        return "3m"
+    if re.search(r"\b(next|this|coming)\s+year\b|\byear\b", lowered):
+        return "12m"
+
+    if re.search(r"\b(today|tonight)\b", lowered):
+        return today.isoformat()
+    if re.search(r"\btomorrow\b", lowered):
+        return (today + timedelta(days=1)).isoformat()
+    if re.search(r"\b(this|the)\s+weekend\b|\bweekend\b", lowered):
+        return (today + timedelta(days=6 - today.weekday())).isoformat()
+
+    m = re.search(r"\b(?:on|by|until|till|before|this|next|coming)?\s*(" + "|".join(WEEKDAYS) + r")\b", lowered)
+    if m:
+        days_ahead = (WEEKDAYS.index(m[1]) - today.weekday()) % 7
+        return (today + timedelta(days=days_ahead)).isoformat()
+
+    if TEMPORAL_CUE.search(lowered):
+        return None
+    return default
+
+
+# Phrase corpus: (text, expected token) with today = Monday 2025-11-03
+CORPUS = [
+    ("show events next 6 months", "6m"),
+    ("events till 2025-12-31", "2025-12-31"),
+    ("what do I have next week", "7d"),
+    ("show my schedule for the next 2 weeks", "14d"),
+    ("anything this week?", "7d"),
+    ("meetings this month", "30d"),
+    ("events next month", "1m"),
+    ("list events for the next 30 days", "30d"),
+    ("next three months please", "3m"),
+    ("get events for a year", "12m"),
+    ("show events until 31/12/2025", "2025-12-31"),
+    ("events by 5th December", "2025-12-05"),
+    ("events before Jan 15", "2026-01-15"),
+    ("events through March 3, 2026", "2026-03-03"),
+    ("show events until February", "2026-02-28"),
+    ("what's on today", "2025-11-03"),
+    ("do I have anything tomorrow at 10 am", "2025-11-04"),
+    ("am I free this weekend", "2025-11-09"),
+    ("delete my meeting on Friday", "2025-11-07"),
+    ("get all the events", DEFAULT_PERIOD),
+    ("delete my study sessions", DEFAULT_PERIOD),
+    ("plan version 2 of the release at 3pm", DEFAULT_PERIOD),
+    ("events until the semester ends", None),
+    ("remind me to work on the project", DEFAULT_PERIOD),
+    ("show events until 31/02/2025", None),
+    ("show events in december", "2025-12-31"),
+    ("what is on my calendar in January", "2026-01-31"),
+    ("delete all my March sessions", "2026-03-31"),
+    ("show events from now to christmas", "2025-12-25"),
+    ("anything before new year's eve?", "2025-12-31"),
+    ("what do I have on the 15th", "2025-11-15"),
+    ("am I free on the 2nd", "2025-12-02"),
+    ("events for the week after next", "2025-11-23"),
+    ("may I see my events", DEFAULT_PERIOD),
+    ("what do I have around diwali", None),
+    ("delete the 2nd meeting", None),
+]
+
+
+if "__main__" == __name__:
+    reference_day = date(2025, 11, 3)
+    failures = 0
+    for phrase, expected in CORPUS:
+        got = parse_period(phrase, today=reference_day)
+        status = "ok " if got == expected else "FAIL"
+        failures += got != expected
+        print(f"{status} {phrase!r:50} -> {got!r} (expected {expected!r})")
+    print(f"{len(CORPUS) - failures}/{len(CORPUS)} phrases parsed as expected")
@@ -0,0 +1,86 @@
+# utils/planning.py - Deterministic free-slot allocation for the planner
+
+from datetime import datetime, time, timedelta
+
+# Sessions start on these boundaries, e.g. 15:00 or 15:15, never 14:37:12
+SLOT_ALIGN_MINUTES = 15
+
+
+def _parse_clock(value: str) -> timedelta:
+    """ "09:00" -> 9 hours after midnight; "24:00" is the end of the day"""
+    if value == "24:00":
+        return timedelta(days=1)
+    clock = time.fromisoformat(value)
+    return timedelta(hours=clock.hour, minutes=clock.minute)
+
+
+def _align_up(moment: datetime, minutes: int) -> datetime:
+    """Round up to the next multiple of `minutes` past midnight"""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    step = timedelta(minutes=minutes)
+    return midnight + -(-(moment - midnight) // step) * step
+
+
+def allocate_sessions(busy, window_start: datetime, window_end: datetime,
+                      topics: list, hours_per_day: float,
+                      work_start: str = "09:00", work_end: str = "21:00",
+                      session_minutes: int = 60, break_minutes: int = 0,
+                      align_minutes: int = SLOT_ALIGN_MINUTES):
+    """
+    Lay out non-overlapping sessions between window_start and window_end.
+
+    busy: merged, sorted (start, end) intervals (see merge_intervals).
+    Each day only uses its [work_start, work_end) hours and at most
+    hours_per_day of sessions; starts are rounded up to align_minutes
+    boundaries. One sweep over the sorted busy list covers
+    all days, and topics are assigned round-robin so they stay balanced.
+
+    Returns create_event-ready dicts, in time order.
+    """
+    if not topics:
+        raise ValueError("At least one topic is required")
+    if session_minutes <= 0:
+        raise ValueError("session_minutes must be positive")
+
+    session = timedelta(minutes=session_minutes)
+    gap = timedelta(minutes=break_minutes)
+    daily_budget = int(hours_per_day * 60 // session_minutes)
+    day_open, day_close = _parse_clock(work_start), _parse_clock(work_end)
+    tz = window_start.tzinfo
+
+    sessions = []
+    cursor_busy = 0  # sweep position: first busy interval that may still matter
+    day = window_start.date()
+    while day <= window_end.date() and daily_budget > 0:
+        midnight = datetime.combine(day, time.min, tzinfo=tz)
+        open_at = _align_up(max(midnight + day_open, window_start), align_minutes)
+        close_at = min(midnight + day_close, window_end)
+
+        # Skip busy intervals that ended before today's working hours
+        while cursor_busy < len(busy) and busy[cursor_busy][1] <= open_at:
+            cursor_busy += 1
+
+        slot = open_at
+        used = 0
+        i = cursor_busy
+        while used < daily_budget and slot + session <= close_at:
+            # Jump past any busy interval overlapping [slot, slot + session)
+            while i < len(busy) and busy[i][1] <= slot:
+                i += 1
+            if i < len(busy) and busy[i][0] < slot + session:
+                slot = _align_up(busy[i][1], align_minutes)
+                continue
+
+            topic = topics[len(sessions) % len(topics)]
+            sessions.append({
+                "summary": topic,
+                "description": f"Planned session {len(sessions) + 1}: {topic}",
+                "start": {"dateTime": slot.isoformat(timespec="seconds")},
+                "end": {"dateTime": (slot + session).isoformat(timespec="seconds")},
+            })
+            used += 1
+            slot += session + gap
+
+        day += timedelta(days=1)
+
+    return sessions
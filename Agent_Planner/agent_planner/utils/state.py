@@ -1,15 +1,30 @@
 from typing import Annotated, TypedDict, Optional
 from langgraph.graph.message import BaseMessage, add_messages
 
+
+def last_value(current, update):
+    """
+    Reducer for keys written by parallel branches: several writes in one
+    step are applied in order instead of raising, and None never clobbers
+    a value another branch already set.
+    """
+    return current if update is None else update
+
+
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    summary: str  # rolling summary of turns folded out of messages
     current_time: str
-    task_type: str
-    tasks: list[dict]
+    task_type: Annotated[str, last_value]
+    tasks: Annotated[list[dict], last_value]
+    period: Annotated[str, last_value]
+    # Last fetched window, reused across human-feedback turns of a thread:
+    # {"period", "events", "fetched_at", "write_count"}
+    events_window: Optional[dict]
     
     # NEW: Memory fields
     user_id: str
     thread_id: str
-    relevant_preferences: Optional[list]
-    similar_conversations: Optional[list]
-    scheduling_patterns: Optional[list]
+    relevant_preferences: Annotated[Optional[list], last_value]
+    similar_conversations: Annotated[Optional[list], last_value]
+    scheduling_patterns: Annotated[Optional[list], last_value]
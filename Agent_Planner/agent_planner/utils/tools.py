@@ -1,8 +1,9 @@
 from langchain_core.tools import tool
 from .google_calendar import GoogleCalendar
+from .planning import allocate_sessions
 
-google_cal = GoogleCalendar()
-google_cal.connect("credentials.json")
+# Connects (OAuth + client build) on the first calendar call, not at import
+google_cal = GoogleCalendar(credentials_file="credentials.json")
 
 
 @tool()
@@ -52,20 +53,13 @@ def create_event(
        }
 
     Returns a list of created event‐objects (or a single‐item list for the single event mode).
+    In list mode, an event that could not be created is returned as {"error": ..., "summary": ...}.
     """
     created_events = []
 
     if events_list is not None:
-        # Loop mode
-        for ev in events_list:
-            # event_payload = {
-            #     "summary": ev.get("summary"),
-            #     "description": ev.get("description"),
-            #     "start": {"dateTime": ev["start"]["dateTime"]},
-            #     "end":   {"dateTime": ev["end"]["dateTime"]},
-            # }
-            created = google_cal.create_event(ev)
-            created_events.append(created)
+        # Batch mode: one batched HTTP request per 50 events
+        created_events = google_cal.create_events(events_list)
     else:
         # Single‐event mode
         if None in (summary, description, strt_dateTime, end_dateTime):
@@ -95,3 +89,55 @@ def delete_event(event_id:str):
             delete_event("abc123xyz")
         """
     return google_cal.delete_event(event_id)
+
+
+@tool
+def delete_events(event_ids: list[str]) -> dict:
+    """
+        Deletes several events from the user's primary Google Calendar in one batch.
+        Prefer this over calling delete_event repeatedly.
+        use the get_event tool to extract the event ids
+
+        Parameters:
+            event_ids (list[str]): The unique IDs of the calendar events to delete.
+
+        Returns:
+            dict mapping each event_id to True (deleted) or False (failed).
+
+        Example:
+            delete_events(["abc123xyz", "def456uvw"])
+        """
+    return google_cal.delete_events(event_ids)
+
+
+@tool
+def plan_sessions(
+    topics: list[str],
+    deadline: str,
+    hours_per_day: float,
+    work_start: str = "09:00",
+    work_end: str = "21:00",
+    session_minutes: int = 60,
+) -> list[dict]:
+    """
+    Computes a time-blocked plan in the user's free calendar time, from now
+    until the deadline. Sessions never overlap existing events or each other.
+
+    Parameters:
+        topics (list[str]): Topics/milestones; sessions rotate through them.
+        deadline (str): Last day to schedule, "YYYY-MM-DD".
+        hours_per_day (float): Maximum session hours per day.
+        work_start (str): Earliest session start each day, "HH:MM" (+05:30).
+        work_end (str): Latest session end each day, "HH:MM" (+05:30).
+        session_minutes (int): Length of one session.
+
+    Returns a list of events ({"summary", "description", "start", "end"})
+    that can be passed unchanged to create_event(events_list=...).
+
+    Example:
+        plan_sessions(["Algebra", "Geometry"], "2025-12-31", 2)
+    """
+    start, end, busy = google_cal.get_busy_intervals(deadline)
+    return allocate_sessions(
+        busy, start, end, topics, hours_per_day, work_start, work_end, session_minutes
+    )
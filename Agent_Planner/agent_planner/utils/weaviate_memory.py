@@ -2,14 +2,36 @@ import weaviate
 from weaviate.classes.init import Auth
 from weaviate.classes.config import Configure, Property, DataType
 from weaviate.classes.query import Filter
-from datetime import datetime, timezone
-import json
+from weaviate.classes.data import DataObject
+from collections import OrderedDict, defaultdict
+import queue
+import threading
+import time
+import uuid as uuid_lib
+import httpx
 import os
 from dotenv import load_dotenv
+from utils.memory_store import (
+    MemoryStore,
+    USER_PREFERENCE,
+    CONVERSATION_MEMORY,
+    SCHEDULING_PATTERN,
+    NO_EMBEDDING,
+)
 
 load_dotenv()
 
-class WeaviateMemoryStore:
+# Must match the text2vec_cohere model the collections are created with
+EMBED_MODEL = "embed-english-v3.0"
+COHERE_EMBED_URL = "https://api.cohere.com/v1/embed"
+QUERY_EMBEDDING_CACHE_SIZE = 256
+
+# Write-behind queue: inserts are batched and flushed on size or age
+WRITE_BATCH_SIZE = 50
+WRITE_FLUSH_INTERVAL = 2.0  # seconds
+DELETE_BATCH_SIZE = 100
+
+class WeaviateMemoryStore(MemoryStore):
     def __init__(self):
         """Initialize Weaviate Cloud connection with free Cohere embeddings"""
         
@@ -24,261 +46,394 @@ class WeaviateMemoryStore:
             )
             
             print(f"✓ Connected to Weaviate Cloud: {self.client.is_ready()}")
-            self._create_collections()
+            self._checked_collections = set()
+            self._schema_lock = threading.Lock()
+            
+            # Query embeddings are computed once here and reused across collections
+            self._http = httpx.Client(timeout=10.0)
+            self._embedding_cache = OrderedDict()
+            self._embedding_lock = threading.Lock()
+            
+            # Background writer for conversation/pattern inserts
+            self._write_queue = queue.Queue()
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="memory-writer", daemon=True
+            )
+            self._writer.start()
         except Exception as e:
             print(f"✗ Failed to connect to Weaviate: {e}")
             raise
     
-    def _get_rfc3339_timestamp(self):
-        """Generate RFC 3339 compliant timestamp with timezone"""
-        return datetime.now(timezone.utc).isoformat()
-    
-    def _create_collections(self):
-        """Create collections with free Cohere embeddings"""
+    def _enqueue_write(self, collection_name: str, data_object: dict, object_id=None):
+        """Queue an insert for the background writer and return its UUID"""
         
-        # Get existing collections - list_all() returns dict in v4
-        try:
-            existing = self.client.collections.list_all(simple=True)
-            existing_names = list(existing.keys()) if isinstance(existing, dict) else []
-            print(f"Existing collections: {existing_names}")
-        except Exception as e:
-            print(f"Error listing collections: {e}")
-            existing_names = []
+        object_id = object_id or uuid_lib.uuid4()
+        self._write_queue.put(
+            (collection_name, DataObject(properties=data_object, uuid=object_id))
+        )
+        return object_id
+    
+    def _writer_loop(self):
+        """Collect queued inserts and write them with insert_many.
+        A batch is flushed when it is full, when its oldest item is
+        WRITE_FLUSH_INTERVAL old, on flush() and on close()."""
         
-        # 1. User Preferences Collection
-        if "UserPreference" not in existing_names:
+        pending = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
             try:
-                self.client.collections.create(
-                    name="UserPreference",
-                    description="User scheduling preferences and patterns",
-                    vectorizer_config=Configure.Vectorizer.text2vec_cohere(
-                        model="embed-english-v3.0",
-                    ),
-                    properties=[
-                        Property(name="userId", data_type=DataType.TEXT),
-                        Property(name="preferenceText", data_type=DataType.TEXT),
-                        Property(name="preferenceType", data_type=DataType.TEXT),
-                        Property(name="preferenceData", data_type=DataType.TEXT),
-                        Property(name="timestamp", data_type=DataType.DATE),
-                    ]
-                )
-                print("✓ Created UserPreference collection")
-            except Exception as e:
-                print(f"UserPreference collection error: {e}")
-        else:
-            print("✓ UserPreference collection already exists")
+                item = self._write_queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write_batch(pending)
+                pending = []
+                continue
+            
+            if item is None:  # shutdown
+                self._write_batch(pending)
+                return
+            if isinstance(item, threading.Event):  # flush request
+                self._write_batch(pending)
+                pending = []
+                item.set()
+                continue
+            
+            if not pending:
+                deadline = time.monotonic() + WRITE_FLUSH_INTERVAL
+            pending.append(item)
+            if len(pending) >= WRITE_BATCH_SIZE:
+                self._write_batch(pending)
+                pending = []
+    
+    def _write_batch(self, pending: list):
+        """Insert a batch of queued objects, one insert_many per collection"""
         
-        # 2. Conversation Memory Collection
-        if "ConversationMemory" not in existing_names:
-            try:
-                self.client.collections.create(
-                    name="ConversationMemory",
-                    description="Semantic conversation history",
-                    vectorizer_config=Configure.Vectorizer.text2vec_cohere(
-                        model="embed-english-v3.0",
-                    ),
-                    properties=[
-                        Property(name="userId", data_type=DataType.TEXT),
-                        Property(name="threadId", data_type=DataType.TEXT),
-                        Property(name="conversationText", data_type=DataType.TEXT),
-                        Property(name="userMessage", data_type=DataType.TEXT),
-                        Property(name="assistantMessage", data_type=DataType.TEXT),
-                        Property(name="taskType", data_type=DataType.TEXT),
-                        Property(name="successful", data_type=DataType.BOOL),
-                        Property(name="timestamp", data_type=DataType.DATE),
-                    ]
-                )
-                print("✓ Created ConversationMemory collection")
-            except Exception as e:
-                print(f"ConversationMemory collection error: {e}")
-        else:
-            print("✓ ConversationMemory collection already exists")
+        by_collection = defaultdict(list)
+        for collection_name, data_object in pending:
+            by_collection[collection_name].append(data_object)
         
-        # 3. Scheduling Patterns Collection
-        if "SchedulingPattern" not in existing_names:
+        for collection_name, objects in by_collection.items():
             try:
-                self.client.collections.create(
-                    name="SchedulingPattern",
-                    description="Learned scheduling patterns",
-                    vectorizer_config=Configure.Vectorizer.text2vec_cohere(
-                        model="embed-english-v3.0",
-                    ),
-                    properties=[
-                        Property(name="userId", data_type=DataType.TEXT),
-                        Property(name="patternDescription", data_type=DataType.TEXT),
-                        Property(name="taskType", data_type=DataType.TEXT),
-                        Property(name="taskSummary", data_type=DataType.TEXT),
-                        Property(name="preferredTime", data_type=DataType.TEXT),
-                        Property(name="duration", data_type=DataType.INT),
-                        Property(name="dayPattern", data_type=DataType.TEXT),
-                        Property(name="frequency", data_type=DataType.INT),
-                        Property(name="timestamp", data_type=DataType.DATE),
-                    ]
-                )
-                print("✓ Created SchedulingPattern collection")
+                collection = self._collection(collection_name)
+                if collection_name == SCHEDULING_PATTERN:
+                    objects = self._upsert_patterns(collection, objects)
+                    if not objects:
+                        continue
+                result = collection.data.insert_many(objects)
+                if result.has_errors:
+                    print(f"⚠ {len(result.errors)} of {len(objects)} {collection_name} inserts failed")
+                else:
+                    print(f"✓ Stored {len(objects)} {collection_name} objects")
             except Exception as e:
-                print(f"SchedulingPattern collection error: {e}")
-        else:
-            print("✓ SchedulingPattern collection already exists")
+                print(f"⚠ Batch insert into {collection_name} failed: {e}")
+    
+    def _upsert_patterns(self, collection, objects: list):
+        """
+        Bump frequency/timestamp of patterns that already exist and return
+        only the genuinely new ones, which still need inserting (and embedding).
+        """
+        
+        # Collapse repeats queued within this batch
+        merged = {}
+        for obj in objects:
+            key = str(obj.uuid)
+            if key in merged:
+                merged[key].properties["frequency"] += obj.properties["frequency"]
+                merged[key].properties["timestamp"] = obj.properties["timestamp"]
+            else:
+                merged[key] = obj
+        
+        existing = collection.query.fetch_objects(
+            filters=Filter.by_id().contains_any(list(merged)),
+            limit=len(merged)
+        )
+        for found in existing.objects:
+            obj = merged.pop(str(found.uuid))
+            collection.data.update(
+                uuid=found.uuid,
+                properties={
+                    "frequency": (found.properties.get("frequency") or 1) + obj.properties["frequency"],
+                    "timestamp": obj.properties["timestamp"]
+                }
+            )
+        
+        if existing.objects:
+            print(f"✓ Updated {len(existing.objects)} existing scheduling patterns")
+        return list(merged.values())
+    
+    def flush(self, timeout: float = None):
+        """Block until every queued insert has been written"""
+        
+        done = threading.Event()
+        self._write_queue.put(done)
+        return done.wait(timeout)
+    
+    def embed_query(self, text: str):
+        """Embed a search query with Cohere, using an LRU cache of recent queries.
+        Returns None if the embedding call fails so callers can fall back to near_text."""
+        
+        with self._embedding_lock:
+            if text in self._embedding_cache:
+                self._embedding_cache.move_to_end(text)
+                return self._embedding_cache[text]
+        
+        try:
+            response = self._http.post(
+                COHERE_EMBED_URL,
+                headers={"Authorization": f"Bearer {os.getenv('COHERE_API_KEY')}"},
+                json={
+                    "model": EMBED_MODEL,
+                    "texts": [text],
+                    "input_type": "search_query",
+                }
+            )
+            response.raise_for_status()
+            vector = response.json()["embeddings"][0]
+        except Exception as e:
+            print(f"⚠ Query embedding failed, using near_text: {e}")
+            return None
+        
+        with self._embedding_lock:
+            self._embedding_cache[text] = vector
+            self._embedding_cache.move_to_end(text)
+            while len(self._embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+        return vector
+    
+    def _search(self, collection, query: str, limit: int, filters, query_vector=None):
+        """Vector search with a precomputed/cached embedding, else server-side near_text"""
+        
+        if query_vector is None:
+            query_vector = self.embed_query(query)
+        
+        if query_vector is not None and query_vector is not NO_EMBEDDING:
+            return collection.query.near_vector(
+                near_vector=query_vector,
+                limit=limit,
+                filters=filters
+            )
+        return collection.query.near_text(
+            query=query,
+            limit=limit,
+            filters=filters
+        )
+    
+    # Schema of each collection, created on first use if missing
+    COLLECTION_SCHEMAS = {
+        USER_PREFERENCE: (
+            "User scheduling preferences and patterns",
+            [
+                Property(name="userId", data_type=DataType.TEXT),
+                Property(name="preferenceText", data_type=DataType.TEXT),
+                Property(name="preferenceType", data_type=DataType.TEXT),
+                Property(name="preferenceData", data_type=DataType.TEXT),
+                Property(name="timestamp", data_type=DataType.DATE),
+            ],
+        ),
+        CONVERSATION_MEMORY: (
+            "Semantic conversation history",
+            [
+                Property(name="userId", data_type=DataType.TEXT),
+                Property(name="threadId", data_type=DataType.TEXT),
+                Property(name="conversationText", data_type=DataType.TEXT),
+                Property(name="userMessage", data_type=DataType.TEXT),
+                Property(name="assistantMessage", data_type=DataType.TEXT),
+                Property(name="taskType", data_type=DataType.TEXT),
+                Property(name="successful", data_type=DataType.BOOL),
+                Property(name="timestamp", data_type=DataType.DATE),
+            ],
+        ),
+        SCHEDULING_PATTERN: (
+            "Learned scheduling patterns",
+            [
+                Property(name="userId", data_type=DataType.TEXT),
+                Property(name="patternDescription", data_type=DataType.TEXT),
+                Property(name="taskType", data_type=DataType.TEXT),
+                Property(name="taskSummary", data_type=DataType.TEXT),
+                Property(name="preferredTime", data_type=DataType.TEXT),
+                Property(name="duration", data_type=DataType.INT),
+                Property(name="dayPattern", data_type=DataType.TEXT),
+                Property(name="frequency", data_type=DataType.INT),
+                Property(name="timestamp", data_type=DataType.DATE),
+            ],
+        ),
+    }
+    
+    def _collection(self, collection_name: str):
+        """
+        Collection handle. The schema check (and creation with free Cohere
+        embeddings, if missing) runs on the first use of each collection
+        only, instead of listing every collection at startup.
+        """
+        
+        if collection_name not in self._checked_collections:
+            with self._schema_lock:
+                if collection_name not in self._checked_collections:
+                    self._ensure_collection(collection_name)
+                    self._checked_collections.add(collection_name)
+        return self.client.collections.get(collection_name)
+    
+    def _ensure_collection(self, collection_name: str):
+        try:
+            if self.client.collections.exists(collection_name):
+                return
+            description, properties = self.COLLECTION_SCHEMAS[collection_name]
+            self.client.collections.create(
+                name=collection_name,
+                description=description,
+                vectorizer_config=Configure.Vectorizer.text2vec_cohere(
+                    model=EMBED_MODEL,
+                ),
+                properties=properties
+            )
+            print(f"✓ Created {collection_name} collection")
+        except Exception as e:
+            print(f"{collection_name} collection error: {e}")
     
     def store_user_preference(self, user_id: str, preference_text: str, 
                              preference_type: str, preference_data: dict):
         """Store user preference with automatic embedding"""
         
-        collection = self.client.collections.get("UserPreference")
+        collection = self._collection(USER_PREFERENCE)
         
-        data_object = {
-            "userId": user_id,
-            "preferenceText": preference_text,
-            "preferenceType": preference_type,
-            "preferenceData": json.dumps(preference_data),
-            "timestamp": self._get_rfc3339_timestamp()
-        }
+        data_object = self._preference_properties(
+            user_id, preference_text, preference_type, preference_data
+        )
         
         uuid = collection.data.insert(data_object)
         print(f"✓ Stored preference: {preference_type} (UUID: {uuid})")
         return uuid
     
-    def get_relevant_preferences(self, user_id: str, query: str, limit: int = 5):
+    def get_relevant_preferences(self, user_id: str, query: str, limit: int = 5,
+                                 query_vector=None):
         """Retrieve semantically similar preferences"""
         
-        collection = self.client.collections.get("UserPreference")
+        collection = self._collection(USER_PREFERENCE)
         
-        response = collection.query.near_text(
-            query=query,
-            limit=limit,
-            filters=Filter.by_property("userId").equal(user_id)
+        response = self._search(
+            collection,
+            query,
+            limit,
+            Filter.by_property("userId").equal(user_id),
+            query_vector=query_vector
         )
         
-        results = []
-        for obj in response.objects:
-            results.append({
-                "text": obj.properties["preferenceText"],
-                "type": obj.properties["preferenceType"],
-                "data": json.loads(obj.properties["preferenceData"]),
-                "timestamp": obj.properties["timestamp"]
-            })
-        
-        return results
+        return [self._preference_result(obj.properties) for obj in response.objects]
     
     def store_conversation_turn(self, user_id: str, thread_id: str,
                                 user_message: str, assistant_response: str,
                                 task_type: str, successful: bool = True):
-        """Store conversation with semantic embedding"""
-        
-        collection = self.client.collections.get("ConversationMemory")
-        
-        conversation_text = f"""
-        User asked: {user_message}
-        Assistant responded: {assistant_response}
-        Task was: {task_type}
-        """
+        """Queue conversation for a batched insert with semantic embedding"""
         
-        data_object = {
-            "userId": user_id,
-            "threadId": thread_id,
-            "conversationText": conversation_text.strip(),
-            "userMessage": user_message,
-            "assistantMessage": assistant_response,
-            "taskType": task_type,
-            "successful": successful,
-            "timestamp": self._get_rfc3339_timestamp()
-        }
+        data_object = self._conversation_properties(
+            user_id, thread_id, user_message, assistant_response, task_type, successful
+        )
         
-        uuid = collection.data.insert(data_object)
-        print(f"✓ Stored conversation (UUID: {uuid})")
+        uuid = self._enqueue_write(CONVERSATION_MEMORY, data_object)
+        print(f"✓ Queued conversation (UUID: {uuid})")
         return uuid
     
     def retrieve_similar_conversations(self, user_id: str, current_context: str, 
-                                      limit: int = 3):
+                                      limit: int = 3, query_vector=None):
         """Find semantically similar past conversations"""
         
-        collection = self.client.collections.get("ConversationMemory")
+        collection = self._collection(CONVERSATION_MEMORY)
         
-        response = collection.query.near_text(
-            query=current_context,
-            limit=limit,
-            filters=Filter.by_property("userId").equal(user_id)
+        response = self._search(
+            collection,
+            current_context,
+            limit,
+            Filter.by_property("userId").equal(user_id),
+            query_vector=query_vector
         )
         
-        results = []
-        for obj in response.objects:
-            results.append({
-                "user_message": obj.properties["userMessage"],
-                "assistant_message": obj.properties["assistantMessage"],
-                "task_type": obj.properties["taskType"],
-                "timestamp": obj.properties["timestamp"]
-            })
-        
-        return results
+        return [self._conversation_result(obj.properties) for obj in response.objects]
     
     def store_scheduling_pattern(self, user_id: str, pattern_description: str,
                             task_type: str, task_data: dict):
-        """Store scheduling pattern with embedding"""
-        
-        collection = self.client.collections.get("SchedulingPattern")
+        """Queue scheduling pattern for a batched upsert; repeats bump its frequency"""
         
-        # FIXED: Convert all fields to strings explicitly
-        preferred_time = task_data.get("start", "")
-        if isinstance(preferred_time, dict):
-            # If it's a dict (like {'dateTime': '...', 'timeZone': '...'}), extract the datetime
-            preferred_time = preferred_time.get("dateTime", str(preferred_time))
-        preferred_time = str(preferred_time) if preferred_time else ""
-        
-        task_summary = task_data.get("summary", "")
-        task_summary = str(task_summary) if task_summary else ""
-        
-        day_pattern = task_data.get("day_pattern", "weekday")
-        day_pattern = str(day_pattern) if day_pattern else "weekday"
-        
-        duration = task_data.get("duration", 60)
-        try:
-            duration = int(duration)
-        except (ValueError, TypeError):
-            duration = 60
-        
-        data_object = {
-            "userId": user_id,
-            "patternDescription": pattern_description,
-            "taskType": task_type,
-            "taskSummary": task_summary,
-            "preferredTime": preferred_time,  # Now guaranteed to be string
-            "duration": duration,              # Now guaranteed to be int
-            "dayPattern": day_pattern,         # Now guaranteed to be string
-            "frequency": 1,
-            "timestamp": self._get_rfc3339_timestamp()
-        }
+        data_object = self._pattern_properties(
+            user_id, pattern_description, task_type, task_data
+        )
         
-        uuid = collection.data.insert(data_object)
-        print(f"✓ Stored scheduling pattern (UUID: {uuid})")
+        uuid = self._enqueue_write(
+            SCHEDULING_PATTERN, data_object, object_id=self._pattern_uuid(data_object)
+        )
+        print(f"✓ Queued scheduling pattern (UUID: {uuid})")
         return uuid
 
     
     def find_similar_patterns(self, user_id: str, task_description: str, 
-                            limit: int = 5):
+                            limit: int = 5, query_vector=None):
         """Find similar past scheduling decisions"""
         
-        collection = self.client.collections.get("SchedulingPattern")
+        collection = self._collection(SCHEDULING_PATTERN)
         
-        response = collection.query.near_text(
-            query=task_description,
-            limit=limit,
-            filters=Filter.by_property("userId").equal(user_id)
+        response = self._search(
+            collection,
+            task_description,
+            limit,
+            Filter.by_property("userId").equal(user_id),
+            query_vector=query_vector
         )
         
-        results = []
-        for obj in response.objects:
-            results.append({
-                "description": obj.properties["patternDescription"],
-                "task_type": obj.properties["taskType"],
-                "preferred_time": obj.properties["preferredTime"],
-                "duration": obj.properties["duration"],
-                "day_pattern": obj.properties["dayPattern"]
-            })
-        
-        return results
+        return [self._pattern_result(obj.properties) for obj in response.objects]
+    
+    def iter_conversation_memory(self):
+        """Yield (uuid, properties) for every stored conversation turn"""
+        
+        collection = self._collection(CONVERSATION_MEMORY)
+        for obj in collection.iterator():
+            yield obj.uuid, obj.properties
+    
+    def delete_conversation_memory(self, object_ids: list):
+        """Delete conversation turns by UUID, in chunks"""
+        
+        collection = self._collection(CONVERSATION_MEMORY)
+        deleted = 0
+        for start in range(0, len(object_ids), DELETE_BATCH_SIZE):
+            chunk = object_ids[start:start + DELETE_BATCH_SIZE]
+            result = collection.data.delete_many(
+                where=Filter.by_id().contains_any(chunk)
+            )
+            deleted += result.successful
+        print(f"✓ Deleted {deleted} conversation turns")
+        return deleted
+    
+    def insert_conversation_memory(self, data_objects: list):
+        """
+        Write prepared conversation objects (e.g. digests) synchronously,
+        bypassing the write-behind queue. All or nothing: if any insert
+        fails, the ones that landed are deleted again and False is returned.
+        """
+        
+        collection = self._collection(CONVERSATION_MEMORY)
+        inserted = []
+        try:
+            for start in range(0, len(data_objects), WRITE_BATCH_SIZE):
+                chunk = data_objects[start:start + WRITE_BATCH_SIZE]
+                result = collection.data.insert_many(chunk)
+                inserted.extend(result.uuids.values())
+                if result.has_errors:
+                    raise RuntimeError(
+                        f"{len(result.errors)} of {len(chunk)} inserts failed: "
+                        f"{next(iter(result.errors.values()))}"
+                    )
+        except Exception as e:
+            print(f"✗ Conversation insert failed, rolling back {len(inserted)} objects: {e}")
+            if inserted:
+                self.delete_conversation_memory(inserted)
+            return False
+        
+        print(f"✓ Stored {len(inserted)} conversation objects")
+        return True
     
     def close(self):
-        """Close connection properly"""
+        """Flush queued writes, then close connection properly"""
+        if self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join(timeout=30)
+        self._http.close()
         self.client.close()
         print("✓ Weaviate connection closed")
@@ -1,9 +1,12 @@
 # file: api.py
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+import csv
+import io
 
 from core.scheduler import AppointmentScheduler
 
@@ -35,9 +38,49 @@ def read_root():
 def get_doctors():
     return scheduler.get_all_doctors()
 
+@app.get("/stats")
+def get_stats():
+    """Returns aggregate appointment counts for dashboards."""
+    return scheduler.get_stats()
+
 @app.get("/appointments", response_model=List[AppointmentResponse])
-def get_all_appointments():
-    return scheduler.get_all_appointments()
+def get_all_appointments(doctor_id: Optional[int] = None):
+    return scheduler.get_all_appointments(doctor_id=doctor_id)
+
+EXPORT_COLUMNS = ['Status', 'Date & Time', 'Patient Name', 'Phone Number', 'Doctor', 'Specialty', 'Appointment ID']
+
+def _export_rows(doctor_id: Optional[int] = None):
+    """Yields the CSV export one line at a time, joined with doctor details."""
+    doctors = {doc['doctor_id']: doc for doc in scheduler.get_all_doctors()}
+    now_str = datetime.now().isoformat()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    for appt in scheduler.iter_appointments(doctor_id=doctor_id):
+        doctor = doctors.get(appt['doctor_id'], {})
+        writer.writerow([
+            'Completed' if appt['datetime'] < now_str else 'Upcoming',
+            appt['datetime'],
+            appt['patient_name'],
+            appt['phone_number'],
+            doctor.get('name', ''),
+            doctor.get('specialty', ''),
+            appt['appointment_id'],
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+@app.get("/appointments/export.csv")
+def export_appointments(doctor_id: Optional[int] = None):
+    """Streams all appointments as CSV, accepting the same filters as GET /appointments."""
+    filename = f"appointments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return StreamingResponse(
+        _export_rows(doctor_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.post("/appointments", status_code=201, response_model=AppointmentResponse)
 def add_new_appointment(request: AppointmentRequest):
@@ -0,0 +1,137 @@
+# file: benchmark_dashboard.py
+#
+# Times the dashboard's data processing on a synthetic appointment set: the
+# original per-row code paths against the vectorized ones dashboard.py uses
+# now. Needs pandas and numpy only (no Streamlit, no running API):
+#
+#   python benchmark_dashboard.py                    # 100k appointments, best of 3
+#   python benchmark_dashboard.py --rows 20000 --repeat 5
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def make_data(rows: int, doctors: int, seed: int = 0):
+    """Random appointments spread from 30 days ago to 60 days ahead, like the API returns"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    offsets = rng.integers(-30 * 24 * 60, 60 * 24 * 60, size=rows)
+    df_doctors = pd.DataFrame({
+        "doctor_id": np.arange(1, doctors + 1),
+        "name": [f"Dr. Doctor {i}" for i in range(1, doctors + 1)],
+        "specialty": rng.choice(["Cardiologist", "Dermatologist", "Pediatrician"], size=doctors),
+    })
+    df_appointments = pd.DataFrame({
+        "appointment_id": [str(uuid.UUID(int=int(i))) for i in rng.integers(0, 2**63, size=rows)],
+        "doctor_id": rng.integers(1, doctors + 1, size=rows),
+        "patient_name": [f"Patient {i}" for i in range(rows)],
+        "datetime": [(now + timedelta(minutes=int(m))).strftime("%Y-%m-%dT%H:%M") for m in offsets],
+        "phone_number": [f"555-{i % 10000:04d}" for i in range(rows)],
+        "status": "scheduled",
+    })
+    df = pd.merge(df_appointments, df_doctors, on="doctor_id", how="left", suffixes=('', '_doctor'))
+    df['datetime_obj'] = pd.to_datetime(df['datetime'])
+    return df, df_doctors
+
+
+# --- Patient Contact Queue: hours until and urgency bucket ---
+
+def urgency_per_row(df_upcoming, now):
+    urgency = []
+    for _, appt in df_upcoming.iterrows():
+        hours_until = int((pd.to_datetime(appt['datetime_obj']) - now).total_seconds() / 3600)
+        if hours_until <= 2:
+            urgency.append("URGENT")
+        elif hours_until <= 24:
+            urgency.append("HIGH PRIORITY")
+        else:
+            urgency.append("SCHEDULED")
+    return pd.Series(urgency, index=df_upcoming.index)
+
+
+def urgency_vectorized(df_upcoming, now):
+    hours_until_all = ((df_upcoming['datetime_obj'] - now).dt.total_seconds() / 3600).astype(int)
+    return pd.Series(
+        np.select(
+            [hours_until_all <= 2, hours_until_all <= 24],
+            ["URGENT", "HIGH PRIORITY"],
+            default="SCHEDULED",
+        ),
+        index=df_upcoming.index,
+    )
+
+
+# --- Doctor Directory: upcoming appointments per doctor ---
+
+def doctor_counts_per_doctor(df_upcoming, df_doctors):
+    doctor_stats = {}
+    for _, doctor in df_doctors.iterrows():
+        doc_id = doctor['doctor_id']
+        doctor_stats[doc_id] = len(df_upcoming[df_upcoming['doctor_id'] == doc_id])
+    return [doctor_stats.get(doc_id, 0) for doc_id in df_doctors['doctor_id']]
+
+
+def doctor_counts_grouped(df_upcoming, df_doctors):
+    doctor_stats = df_upcoming.groupby('doctor_id').size()
+    return df_doctors['doctor_id'].map(doctor_stats).fillna(0).astype(int).tolist()
+
+
+# --- All Appointments History: status column ---
+
+def status_apply(df, now):
+    df_display = df[['datetime']].sort_values(by='datetime', ascending=False)
+    return df_display['datetime'].apply(
+        lambda x: '✅ Completed' if pd.to_datetime(x) < now else '🔔 Upcoming'
+    ).tolist()
+
+
+def status_vectorized(df, now):
+    df_sorted = df.sort_values(by='datetime_obj', ascending=False)
+    return np.where(df_sorted['datetime_obj'] < now, '✅ Completed', '🔔 Upcoming').tolist()
+
+
+def best_of(repeat: int, func, *args):
+    """(fastest wall time in seconds, result of the last run)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard data processing: per-row vs vectorized")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df, df_doctors = make_data(args.rows, args.doctors)
+    now = datetime.now()
+    df_upcoming = df[df['datetime_obj'] > now].sort_values(by='datetime_obj').reset_index(drop=True)
+    print(f"{len(df)} appointments ({len(df_upcoming)} upcoming), {len(df_doctors)} doctors, best of {args.repeat}\n")
+
+    cases = [
+        ("Contact queue urgency", (urgency_per_row, urgency_vectorized), (df_upcoming, now)),
+        ("Doctor upcoming counts", (doctor_counts_per_doctor, doctor_counts_grouped), (df_upcoming, df_doctors)),
+        ("History status column", (status_apply, status_vectorized), (df, now)),
+    ]
+    for label, (old, new), case_args in cases:
+        old_time, old_result = best_of(args.repeat, old, *case_args)
+        new_time, new_result = best_of(args.repeat, new, *case_args)
+        same = list(old_result) == list(new_result)
+        print(
+            f"{'✓' if same else '✗'} {label:24s} per-row {old_time * 1000:9.1f} ms   "
+            f"vectorized {new_time * 1000:7.1f} ms   {old_time / new_time:6.1f}x"
+            + ("" if same else "   (results differ!)")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 import json
 from datetime import datetime, timedelta  # <-- CHANGED: Import timedelta
 from pathlib import Path
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
 import uuid
 
 class AppointmentScheduler:
@@ -18,6 +20,7 @@ class AppointmentScheduler:
         
         self.doctors = self._load_data(self.doctors_file)
         self.appointments = self._load_data(self.appointments_file)
+        self._build_stats_index()
 
     def _ensure_data_files_exist(self):
         # ... (no changes in this method)
@@ -37,6 +40,38 @@ class AppointmentScheduler:
         except (json.JSONDecodeError, FileNotFoundError):
             return []
 
+    def _build_stats_index(self):
+        """
+        Builds the per-day counters behind get_stats() from the loaded appointments.
+        They are kept up to date by add_appointment and cancel_appointment.
+        """
+        self._day_counts = defaultdict(Counter)  # "YYYY-MM-DD" -> {doctor_id: count}
+        self._day_slots = defaultdict(list)      # "YYYY-MM-DD" -> sorted [(datetime, doctor_id)]
+        for appt in self.appointments:
+            self._index_appointment(appt)
+
+    def _index_appointment(self, appt):
+        day = appt['datetime'][:10]
+        self._day_counts[day][appt['doctor_id']] += 1
+        insort(self._day_slots[day], (appt['datetime'], appt['doctor_id']))
+
+    def _unindex_appointment(self, appt):
+        day = appt['datetime'][:10]
+        counts = self._day_counts[day]
+        counts[appt['doctor_id']] -= 1
+        if counts[appt['doctor_id']] <= 0:
+            del counts[appt['doctor_id']]
+        if not counts:
+            del self._day_counts[day]
+
+        slots = self._day_slots[day]
+        slot = (appt['datetime'], appt['doctor_id'])
+        pos = bisect_left(slots, slot)
+        if pos < len(slots) and slots[pos] == slot:
+            slots.pop(pos)
+        if not slots:
+            del self._day_slots[day]
+
     def _save_appointments(self):
         # ... (no changes in this method)
         with open(self.appointments_file, 'w') as f:
@@ -110,15 +145,18 @@ class AppointmentScheduler:
             "status": "scheduled"
         }
         self.appointments.append(new_appointment)
+        self._index_appointment(new_appointment)
         self._save_appointments()
         return True, "Appointment added successfully.", new_appointment
 
     def cancel_appointment(self, appointment_id):
         # ... (no changes in this method)
-        initial_count = len(self.appointments)
-        self.appointments = [appt for appt in self.appointments if appt['appointment_id'] != appointment_id]
+        removed = [appt for appt in self.appointments if appt['appointment_id'] == appointment_id]
         
-        if len(self.appointments) < initial_count:
+        if removed:
+            self.appointments = [appt for appt in self.appointments if appt['appointment_id'] != appointment_id]
+            for appt in removed:
+                self._unindex_appointment(appt)
             self._save_appointments()
             return True, f"Appointment {appointment_id} canceled successfully."
         else:
@@ -128,14 +166,59 @@ class AppointmentScheduler:
         # ... (no changes in this method)
         return self.doctors
 
-    def get_all_appointments(self):
-        # ... (no changes in this method)
-        self.appointments.sort(key=lambda x: x['datetime'])
-        return self.appointments
+    def get_all_appointments(self, doctor_id=None):
+        return list(self.iter_appointments(doctor_id))
+
+    def iter_appointments(self, doctor_id=None):
+        """
+        Yields appointments in datetime order, optionally only for one doctor.
+        Rows are yielded one at a time so callers can stream them. Iterates
+        a sorted snapshot: the shared list is never mutated here, so a
+        concurrent add/cancel can't cut a streaming export short.
+        """
+        for appt in sorted(self.appointments, key=lambda x: x['datetime']):
+            if doctor_id is None or appt['doctor_id'] == doctor_id:
+                yield appt
 
     def get_upcoming_appointments(self):
         # ... (no changes in this method)
         now_str = datetime.now().isoformat()
         upcoming = [appt for appt in self.appointments if appt['datetime'] >= now_str]
         upcoming.sort(key=lambda x: x['datetime'])
-        return upcoming
\ No newline at end of file
+        return upcoming
+
+    def get_stats(self, now=None):
+        """
+        Returns aggregate counts of upcoming appointments (total, this week, today
+        and per doctor), read from the per-day counters instead of the full list.
+        """
+        now = now or datetime.now()
+        now_str = now.isoformat()
+        today = now.date().isoformat()
+        end_of_week = (now.date() + timedelta(days=6 - now.weekday())).isoformat()
+
+        # Today only counts the slots that have not started yet
+        today_slots = self._day_slots.get(today, [])
+        today_upcoming = today_slots[bisect_left(today_slots, (now_str,)):]
+        per_doctor = Counter(doctor_id for _, doctor_id in today_upcoming)
+
+        total_upcoming = len(today_upcoming)
+        this_week = len(today_upcoming)
+        for day, counts in self._day_counts.items():
+            if day <= today:
+                continue
+            day_total = sum(counts.values())
+            total_upcoming += day_total
+            if day <= end_of_week:
+                this_week += day_total
+            per_doctor.update(counts)
+
+        return {
+            "total_upcoming": total_upcoming,
+            "this_week": this_week,
+            "today": len(today_upcoming),
+            "active_doctors": len(self.doctors),
+            "per_doctor": {
+                doc['doctor_id']: per_doctor.get(doc['doctor_id'], 0) for doc in self.doctors
+            },
+        }
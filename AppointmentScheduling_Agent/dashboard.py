@@ -3,10 +3,23 @@
 import streamlit as st
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import os
+from datetime import datetime
 
 # --- Configuration ---
 API_BASE_URL = "http://127.0.0.1:8000"
+# Address the viewer's browser uses to reach the API (the CSV download link).
+# Set it when people open the dashboard from another machine than the API host.
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", API_BASE_URL)
+QUEUE_PAGE_SIZE = 20  # appointments rendered per page in the contact queue
+
+# Urgency label -> (icon, border color), most urgent first
+URGENCY_STYLES = {
+    "URGENT": ("🔴", "#ff4444"),
+    "HIGH PRIORITY": ("🟠", "#ff9900"),
+    "SCHEDULED": ("🟢", "#00cc00"),
+}
 
 # --- Helper Functions ---
 def get_doctors():
@@ -27,6 +40,15 @@ def get_appointments():
         st.error(f"Error fetching appointments: API server might not be running.")
         return []
 
+def get_stats():
+    try:
+        response = requests.get(f"{API_BASE_URL}/stats")
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error fetching stats: {e}")
+        return {}
+
 # --- Streamlit UI ---
 st.set_page_config(page_title="Appointments Dashboard", layout="wide")
 
@@ -34,8 +56,23 @@ st.title("🗓️ Appointment Scheduling Dashboard")
 st.markdown("Real-time appointment management and doctor directory")
 
 # --- Fetch Data ---
-appointments_data = get_appointments()
 doctors_data = get_doctors()
+stats = get_stats()
+
+# --- Key Metrics ---
+st.subheader("📊 Quick Metrics")
+
+col1, col2, col3, col4 = st.columns(4)
+
+# Aggregates are maintained server-side by the scheduler
+col1.metric("📅 Total Upcoming", stats.get("total_upcoming", 0))
+col2.metric("🔔 This Week", stats.get("this_week", 0))
+col3.metric("👨‍⚕️ Active Doctors", stats.get("active_doctors", len(doctors_data)))
+col4.metric("⏰ Today's Appointments", stats.get("today", 0))
+
+st.divider()
+
+appointments_data = get_appointments()
 
 if appointments_data and doctors_data:
     # --- Data Processing ---
@@ -55,26 +92,6 @@ if appointments_data and doctors_data:
     now = datetime.now()
     df_upcoming = df[df['datetime_obj'] > now].sort_values(by='datetime_obj').reset_index(drop=True)
 
-    # --- Key Metrics ---
-    st.subheader("📊 Quick Metrics")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    start_of_week = now - timedelta(days=now.weekday())
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    appointments_this_week = df_upcoming[
-        (df_upcoming['datetime_obj'].dt.date >= start_of_week.date()) & 
-        (df_upcoming['datetime_obj'].dt.date <= end_of_week.date())
-    ].shape[0]
-    
-    col1.metric("📅 Total Upcoming", len(df_upcoming))
-    col2.metric("🔔 This Week", appointments_this_week)
-    col3.metric("👨‍⚕️ Active Doctors", len(df_doctors))
-    col4.metric("⏰ Today's Appointments", df_upcoming[df_upcoming['datetime_obj'].dt.date == now.date()].shape[0])
-    
-    st.divider()
-
     # --- Main Content Tabs ---
     tab1, tab2, tab3 = st.tabs(["📞 Patient Contact Queue", "👨‍⚕️ Doctor Directory", "📋 All Appointments History"])
 
@@ -83,25 +100,61 @@ if appointments_data and doctors_data:
         st.subheader("Upcoming Appointments - Call Reminders")
         
         if not df_upcoming.empty:
-            # Sort by datetime to show earliest first
-            df_upcoming_sorted = df_upcoming.sort_values(by='datetime_obj')
+            # Urgency bucket for every upcoming appointment, computed in one pass
+            hours_until_all = ((df_upcoming['datetime_obj'] - now).dt.total_seconds() / 3600).astype(int)
+            urgency_all = pd.Series(
+                np.select(
+                    [hours_until_all <= 2, hours_until_all <= 24],
+                    ["URGENT", "HIGH PRIORITY"],
+                    default="SCHEDULED",
+                ),
+                index=df_upcoming.index,
+            )
+            bucket_counts = urgency_all.value_counts()
+            
+            # Summary counts per urgency bucket
+            count_cols = st.columns(len(URGENCY_STYLES))
+            for count_col, (label, (icon, _)) in zip(count_cols, URGENCY_STYLES.items()):
+                count_col.metric(f"{icon} {label.title()}", int(bucket_counts.get(label, 0)))
+            
+            # Pick a bucket and a page; only that slice is rendered
+            filter_col, page_col = st.columns([3, 1])
+            selected_bucket = filter_col.radio(
+                "Urgency",
+                ["ALL"] + list(URGENCY_STYLES),
+                horizontal=True,
+                key="queue_bucket",
+            )
+            
+            if selected_bucket == "ALL":
+                df_queue = df_upcoming
+            else:
+                df_queue = df_upcoming[urgency_all == selected_bucket]
+            
+            total_pages = max(1, -(-len(df_queue) // QUEUE_PAGE_SIZE))
+            page = page_col.number_input(
+                f"Page (of {total_pages})",
+                min_value=1,
+                max_value=total_pages,
+                value=1,
+                step=1,
+                key=f"queue_page_{selected_bucket}",
+            )
+            page_start = (int(page) - 1) * QUEUE_PAGE_SIZE
+            df_page = df_queue.iloc[page_start:page_start + QUEUE_PAGE_SIZE]
+            
+            if df_page.empty:
+                st.info("No appointments in this bucket.")
             
-            for idx, appt in df_upcoming_sorted.iterrows():
+            # df_upcoming is already sorted by datetime, earliest first
+            for row_idx, appt in zip(df_page.index, df_page.to_dict('records')):
                 # Create highlighted box for each appointment
-                appt_time = pd.to_datetime(appt['datetime_obj'])
-                time_until = appt_time - now
-                hours_until = int(time_until.total_seconds() / 3600)
+                appt_time = appt['datetime_obj']
+                hours_until = int(hours_until_all.at[row_idx])
                 
                 # Color code based on urgency
-                if hours_until <= 2:
-                    border_color = "🔴"
-                    urgency_label = "URGENT"
-                elif hours_until <= 24:
-                    border_color = "🟠"
-                    urgency_label = "HIGH PRIORITY"
-                else:
-                    border_color = "🟢"
-                    urgency_label = "SCHEDULED"
+                urgency_label = urgency_all.at[row_idx]
+                border_color, border_hex = URGENCY_STYLES[urgency_label]
                 
                 # Create a visually distinct box
                 with st.container():
@@ -112,7 +165,7 @@ if appointments_data and doctors_data:
                         <div style="
                             background-color: #f0f2f6;
                             padding: 15px;
-                            border-left: 5px solid {'#ff4444' if hours_until <= 2 else '#ff9900' if hours_until <= 24 else '#00cc00'};
+                            border-left: 5px solid {border_hex};
                             border-radius: 5px;
                             margin: 10px 0;
                         ">
@@ -126,6 +179,8 @@ if appointments_data and doctors_data:
                     
                     with col2:
                         st.caption(f"In {hours_until}h" if hours_until > 0 else "NOW")
+            
+            st.caption(f"Showing {len(df_page)} of {len(df_queue)} appointments")
         else:
             st.info("✅ No upcoming appointments found.")
 
@@ -134,19 +189,16 @@ if appointments_data and doctors_data:
         st.subheader("Available Doctors")
         
         if not df_doctors.empty:
-            # Get doctor stats
-            doctor_stats = {}
-            for _, doctor in df_doctors.iterrows():
-                doc_id = doctor['doctor_id']
-                appts_count = len(df_upcoming[df_upcoming['doctor_id'] == doc_id])
-                doctor_stats[doc_id] = appts_count
+            # Per-doctor upcoming counts come from /stats (JSON keys are strings)
+            doctor_stats = stats.get("per_doctor", {})
+            upcoming_counts = df_doctors['doctor_id'].astype(str).map(doctor_stats).fillna(0).astype(int)
             
             # Display doctors in a grid
             cols = st.columns(2)
             
-            for idx, (_, doctor) in enumerate(df_doctors.iterrows()):
+            for idx, doctor in enumerate(df_doctors.to_dict('records')):
                 doc_id = doctor['doctor_id']
-                upcoming_count = doctor_stats.get(doc_id, 0)
+                upcoming_count = upcoming_counts.iat[idx]
                 
                 with cols[idx % 2]:
                     st.markdown(f"""
@@ -178,26 +230,24 @@ if appointments_data and doctors_data:
         st.subheader("Complete Appointment Records")
         
         if not df.empty:
-            # Prepare display dataframe
-            df_display = df[['appointment_id', 'datetime', 'patient_name', 'phone_number', 'name', 'specialty']].copy()
-            
-            # Rename columns for better display
-            df_display.columns = ['Appointment ID', 'Date & Time', 'Patient Name', 'Phone Number', 'Doctor', 'Specialty']
-            
-            # Sort by datetime (most recent first)
-            df_display = df_display.sort_values(by='Date & Time', ascending=False)
-            
-            # Add status column
-            df_display['Status'] = df_display['Date & Time'].apply(
-                lambda x: '✅ Completed' if pd.to_datetime(x) < now else '🔔 Upcoming'
-            )
+            # Sort by datetime (most recent first) on the already parsed column
+            df_sorted = df.sort_values(by='datetime_obj', ascending=False)
+            is_completed = df_sorted['datetime_obj'] < now
             
-            # Reorder columns
-            df_display = df_display[['Status', 'Date & Time', 'Patient Name', 'Phone Number', 'Doctor', 'Specialty', 'Appointment ID']]
+            # Prepare display dataframe with a column-wise status
+            df_display = pd.DataFrame({
+                'Status': np.where(is_completed, '✅ Completed', '🔔 Upcoming'),
+                'Date & Time': df_sorted['datetime'],
+                'Patient Name': df_sorted['patient_name'],
+                'Phone Number': df_sorted['phone_number'],
+                'Doctor': df_sorted['name'],
+                'Specialty': df_sorted['specialty'],
+                'Appointment ID': df_sorted['appointment_id'],
+            })
             
             # Display metrics for this view
-            completed = len(df[df['datetime_obj'] < now])
-            upcoming = len(df[df['datetime_obj'] > now])
+            completed = int(is_completed.sum())
+            upcoming = int((df['datetime_obj'] > now).sum())
             
             col1, col2 = st.columns(2)
             col1.metric("✅ Completed Appointments", completed)
@@ -223,12 +273,11 @@ if appointments_data and doctors_data:
             
             # Export option
             st.divider()
-            csv = df_display.to_csv(index=False)
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name=f"appointments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+            # The API streams the export, so the dashboard never builds the file.
+            # The browser fetches it directly, hence PUBLIC_API_URL.
+            st.link_button(
+                "📥 Download as CSV",
+                f"{PUBLIC_API_URL}/appointments/export.csv"
             )
         else:
             st.info("No appointment records found.")